@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark for ``sendsms.encoding``.
+
+Measures encoding detection and segment counting over a mix of short, long,
+extended-charset and unicode bodies.
+
+Usage::
+
+    PYTHONPATH=. python benchmarks/bench_encoding.py
+"""
+import timeit
+
+from sendsms.encoding import detect_encoding, segment_count, split_segments
+
+BODIES = [
+    "Your verification code is 123456",
+    "Hello {name}, your order #42 costs 10€ and ships today." * 4,
+    "Wêlcome à vous, Henrï & Jack!",
+    "Réservation confirmée pour demain à 10h, merci de votre confiance. " * 3,
+    "a" * 152 + "€" + "b" * 200,
+]
+NUMBER = 200000
+
+
+def run(func):
+    def loop():
+        for body in BODIES:
+            func(body)
+
+    best = min(timeit.repeat(loop, number=NUMBER // len(BODIES), repeat=5))
+    per_body = best / NUMBER
+    print(
+        "%-16s %6.3f us/body  %6.1f M bodies/hour"
+        % (func.__name__, per_body * 1e6, 3600 / per_body / 1e6)
+    )
+
+
+if __name__ == "__main__":
+    for func in (detect_encoding, segment_count, split_segments):
+        run(func)
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark for ``sendsms.api.get_connection``.
+
+Compares resolving the backend class on every call (the old behaviour) with
+the cached lookup.
+
+Usage::
+
+    PYTHONPATH=. python benchmarks/bench_get_connection.py
+"""
+import timeit
+
+from django.conf import settings
+
+settings.configure(SENDSMS_BACKEND="sendsms.backends.locmem.SmsBackend")
+
+from sendsms import api  # noqa: E402
+
+NUMBER = 200000
+
+
+def uncached():
+    klass = api.load_backend.__wrapped__(settings.SENDSMS_BACKEND)
+    return klass(fail_silently=False)
+
+
+def cached():
+    return api.get_connection()
+
+
+if __name__ == "__main__":
+    for name, func in (("uncached", uncached), ("cached", cached)):
+        best = min(timeit.repeat(func, number=NUMBER, repeat=5))
+        print("%-10s %8.3f us/call" % (name, best / NUMBER * 1e6))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Import-time benchmark for the backend modules.
+
+Imports each backend in a fresh interpreter with ``python -X importtime`` and
+reports the cumulative import time of the module and which optional
+third-party libraries were pulled in by the import.
+
+Usage::
+
+    PYTHONPATH=. python benchmarks/bench_importtime.py
+"""
+
+import subprocess
+import sys
+
+BACKENDS = (
+    "bulksms",
+    "celery",
+    "esendex",
+    "nexmo",
+    "ovhsms",
+    "rq",
+    "smsglobal",
+    "smspubli",
+    "smssluzbacz",
+    "twiliorest",
+)
+OPTIONAL = ("requests", "httpx", "twilio", "celery", "django_rq", "smssluzbacz_api")
+REPEAT = 5
+
+CODE = (
+    "from django.conf import settings; settings.configure(); "
+    "import sendsms.backends.%s"
+)
+
+
+def import_time(backend):
+    """
+    Return (cumulative microseconds, imported optional libraries) or None if
+    the backend can't be imported here.
+    """
+    module = "sendsms.backends.%s" % backend
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CODE % backend],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if proc.returncode:
+        return None
+
+    cumulative, imported = None, set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = [field.strip() for field in line[len("import time:") :].split("|")]
+        name = fields[2]
+        if name == module:
+            cumulative = int(fields[1])
+        if name in OPTIONAL:
+            imported.add(name)
+    return cumulative, sorted(imported)
+
+
+if __name__ == "__main__":
+    for backend in BACKENDS:
+        results = [import_time(backend) for i in range(REPEAT)]
+        if None in results:
+            print("%-12s (not importable)" % backend)
+            continue
+        best = min(cumulative for cumulative, imported in results)
+        print(
+            "%-12s %8.1f ms  %s"
+            % (backend, best / 1000.0, ", ".join(results[0][1]) or "-")
+        )
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Memory benchmark for ``sendsms.message.SmsMessage``.
+
+Builds one million messages with tracemalloc running and compares the
+slotted ``SmsMessage`` (with list and tuple recipients) against the former
+``__dict__`` based layout.
+
+Usage::
+
+    PYTHONPATH=. python benchmarks/bench_message_memory.py
+"""
+
+import gc
+import tracemalloc
+
+from django.conf import settings
+
+settings.configure(SENDSMS_DEFAULT_FROM_PHONE="+41791111111")
+
+from sendsms.message import SmsMessage  # noqa: E402
+
+COUNT = 1000000
+
+
+class DictSmsMessage(object):
+    """The SmsMessage layout before __slots__"""
+
+    def __init__(self, body, from_phone=None, to=None, flash=False, connection=None):
+        self.to = list(to) if to else []
+        self.from_phone = from_phone or getattr(
+            settings, "SENDSMS_DEFAULT_FROM_PHONE", ""
+        )
+        self.body = body
+        self.flash = flash
+        self.connection = connection
+
+
+def measure(name, factory, to):
+    gc.collect()
+    tracemalloc.start()
+    messages = [factory(body="I can haz txt", to=to) for i in range(COUNT)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        "%-24s %8.1f MiB  %6.1f bytes/message"
+        % (name, current / 2**20, current / COUNT)
+    )
+    del messages
+
+
+if __name__ == "__main__":
+    measure("dict, list recipients", DictSmsMessage, ["+41791234567"])
+    measure("slots, list recipients", SmsMessage, ["+41791234567"])
+    measure("slots, tuple recipients", SmsMessage, ("+41791234567",))
@@ -1,6 +1,12 @@
 # -*- coding: utf-8 -*-
+import threading
+from functools import lru_cache
+from itertools import islice
+
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 
 try:
     # Django versions >= 1.9
@@ -36,25 +42,129 @@ def send_sms(
 
 
 def send_mass_sms(
-    datatuple, fail_silently=False, auth_user=None, auth_password=None, connection=None
+    datatuple,
+    fail_silently=False,
+    auth_user=None,
+    auth_password=None,
+    connection=None,
+    chunk_size=1000,
+    progress_callback=None,
 ):
     """
     Given a datatuple of (message, from_phone, to, flash), sends each message to each
     recipient list.
 
+    ``datatuple`` can be any iterable, e.g. a generator or a queryset
+    ``.iterator()``. It is consumed in chunks of ``chunk_size`` messages, so
+    memory use does not grow with the size of the campaign.
+
+    :param callable progress_callback: called as ``progress_callback(sent, processed)``
+        after each chunk.
     :returns: the number of SMSs sent.
     """
 
+    connection = connection or get_connection(
+        username=auth_user, password=auth_password, fail_silently=fail_silently
+    )
+    sent = processed = 0
+    new_conn_created = connection.open()
+    try:
+        for messages in _iter_chunks(datatuple, chunk_size):
+            sent += count_sent(connection.send_messages(messages), messages)
+            processed += len(messages)
+            if progress_callback is not None:
+                progress_callback(sent, processed)
+    finally:
+        if new_conn_created:
+            connection.close()
+    return sent
+
+
+def count_sent(result, messages):
+    """
+    Normalize the return value of ``send_messages`` to a number of SMSs sent.
+
+    Some backends return a list of provider results or a boolean instead of
+    a count.
+    """
+    if result is True:
+        return len(messages)
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return int(result or 0)
+
+
+def _iter_chunks(datatuple, chunk_size):
+    from sendsms.message import SmsMessage
+
+    iterator = iter(datatuple)
+    while True:
+        messages = [
+            SmsMessage(body=message, from_phone=from_phone, to=to, flash=flash)
+            for message, from_phone, to, flash in islice(iterator, chunk_size)
+        ]
+        if not messages:
+            return
+        yield messages
+
+
+async def async_send_sms(
+    body,
+    from_phone,
+    to,
+    flash=False,
+    fail_silently=False,
+    auth_user=None,
+    auth_password=None,
+    connection=None,
+):
+    """
+    Asynchronous version of :py:func:`send_sms`.
+
+    :returns: the number of SMSs sent.
+    """
     from sendsms.message import SmsMessage
 
     connection = connection or get_connection(
         username=auth_user, password=auth_password, fail_silently=fail_silently
     )
-    messages = [
-        SmsMessage(message=message, from_phone=from_phone, to=to, flash=flash)
-        for message, from_phone, to, flash in datatuple
-    ]
-    connection.send_messages(messages)
+    return await SmsMessage(
+        body=body, from_phone=from_phone, to=to, flash=flash, connection=connection
+    ).asend()
+
+
+async def async_send_mass_sms(
+    datatuple,
+    fail_silently=False,
+    auth_user=None,
+    auth_password=None,
+    connection=None,
+    chunk_size=1000,
+    progress_callback=None,
+):
+    """
+    Asynchronous version of :py:func:`send_mass_sms`.
+
+    :returns: the number of SMSs sent.
+    """
+    from sendsms.backends.base import AsyncBaseSmsBackend
+
+    connection = connection or get_connection(
+        username=auth_user, password=auth_password, fail_silently=fail_silently
+    )
+    native = isinstance(connection, AsyncBaseSmsBackend)
+    sent = processed = 0
+    new_conn_created = native and await connection.aopen()
+    try:
+        for messages in _iter_chunks(datatuple, chunk_size):
+            sent += count_sent(await connection.asend_messages(messages), messages)
+            processed += len(messages)
+            if progress_callback is not None:
+                progress_callback(sent, processed)
+    finally:
+        if new_conn_created:
+            await connection.aclose()
+    return sent
 
 
 def get_connection(path=None, fail_silently=False, **kwargs):
@@ -70,6 +180,21 @@ def get_connection(path=None, fail_silently=False, **kwargs):
     path = path or getattr(
         settings, "SENDSMS_BACKEND", "sendsms.backends.locmem.SmsBackend"
     )
+    klass = load_backend(path)
+    return klass(fail_silently=fail_silently, **kwargs)
+
+
+@lru_cache(maxsize=None)
+def load_backend(path):
+    """
+    Import and return the sms backend class for a python path.
+
+    Resolved classes are cached by path, the cache is cleared whenever a
+    setting changes (e.g. with ``override_settings``).
+
+    :param string path: backend python path.
+    :returns: backend class.
+    """
     try:
         mod_name, klass_name = path.rsplit(".", 1)
         mod = import_module(mod_name)
@@ -79,10 +204,43 @@ def get_connection(path=None, fail_silently=False, **kwargs):
         )
 
     try:
-        klass = getattr(mod, klass_name)
+        return getattr(mod, klass_name)
     except AttributeError:
         raise ImproperlyConfigured(
             'Module "%s" does not define a "%s" class' % (mod_name, klass_name)
         )
 
-    return klass(fail_silently=fail_silently, **kwargs)
+
+_worker_connections = {}
+_worker_connections_lock = threading.Lock()
+
+
+def get_worker_connection(path):
+    """
+    Return the open connection to ``path`` kept by this process, for the
+    task queue backends to reuse across jobs run by the same worker process.
+
+    Closed and dropped whenever a setting changes.
+    """
+    with _worker_connections_lock:
+        connection = _worker_connections.get(path)
+        if connection is None:
+            connection = get_connection(path)
+            connection.open()
+            _worker_connections[path] = connection
+        return connection
+
+
+def close_worker_connections():
+    """Close and drop the connections kept by get_worker_connection()."""
+    with _worker_connections_lock:
+        connections = list(_worker_connections.values())
+        _worker_connections.clear()
+    for connection in connections:
+        connection.close()
+
+
+@receiver(setting_changed)
+def clear_backend_cache(**kwargs):
+    load_backend.cache_clear()
+    close_worker_connections()
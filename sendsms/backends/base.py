@@ -1,4 +1,131 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import collections
+import contextlib
+import functools
+import logging
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from sendsms import phone
+from sendsms.api import count_sent
+from sendsms.exceptions import InvalidPhoneNumber, SmsTimeout
+from sendsms.retry import RetryPolicy
+from sendsms.signals import sms_batch_sent
+
+logger = logging.getLogger(__name__)
+
+_batch_state = threading.local()
+
+DEFAULT_TIMEOUT = (5, 30)
+
+
+def split_timeout(timeout):
+    """
+    Return ``timeout``, a number or a ``(connect, read)`` tuple, as a
+    ``(connect, read)`` tuple.
+    """
+    if isinstance(timeout, (tuple, list)):
+        return tuple(timeout)
+    return (timeout, timeout)
+
+
+def _send_batch_signal(backend, messages, outcomes, result=None, exception=None):
+    if exception is not None or result is None:
+        sent = None
+    else:
+        sent = count_sent(result, messages)
+    if outcomes is None:
+        if sent is not None and sent >= len(messages):
+            outcomes = [True] * len(messages)
+        elif sent == 0 and exception is None:
+            outcomes = [False] * len(messages)
+        else:
+            outcomes = [None] * len(messages)
+    sms_batch_sent.send(
+        sender=type(backend),
+        backend=backend,
+        messages=messages,
+        outcomes=outcomes,
+        sent=sent,
+        exception=exception,
+    )
+
+
+@contextlib.contextmanager
+def track_outcomes(connection, messages):
+    """
+    Collect the per-message outcomes of ``connection.send_messages(messages)``
+    called in the with block, also when it raises.
+
+    Yields a list with one True/False/None (not known) per message, filled
+    once send_messages() returned.
+    """
+    outcomes = [None] * len(messages)
+
+    def receiver(backend, **kwargs):
+        if backend is connection and kwargs["messages"] is messages:
+            outcomes[:] = kwargs["outcomes"]
+
+    sms_batch_sent.connect(receiver, sender=type(connection), weak=False)
+    try:
+        yield outcomes
+    finally:
+        sms_batch_sent.disconnect(receiver, sender=type(connection))
+
+
+def _batch_signal(send_messages):
+    """
+    Wrap a backend's send_messages() to send :py:data:`sms_batch_sent`.
+
+    Nothing is tracked when no receiver is connected. Nested calls on the same
+    backend (e.g. through super()) only send the signal once.
+    """
+
+    @functools.wraps(send_messages)
+    def wrapper(self, messages):
+        active = getattr(_batch_state, "active", None)
+        if active is None:
+            active = _batch_state.active = {}
+        key = id(self)
+        if key in active or not sms_batch_sent.has_listeners(type(self)):
+            return send_messages(self, messages)
+
+        active[key] = None
+        try:
+            result = send_messages(self, messages)
+        except Exception as e:
+            _send_batch_signal(self, messages, active.pop(key), exception=e)
+            raise
+        _send_batch_signal(self, messages, active.pop(key), result=result)
+        return result
+
+    return wrapper
+
+
+def _async_batch_signal(asend_messages):
+    """
+    Wrap a backend's asend_messages() to send :py:data:`sms_batch_sent`.
+    """
+
+    @functools.wraps(asend_messages)
+    async def wrapper(self, messages):
+        if not sms_batch_sent.has_listeners(type(self)):
+            return await asend_messages(self, messages)
+
+        try:
+            result = await asend_messages(self, messages)
+        except Exception as e:
+            _send_batch_signal(self, messages, None, exception=e)
+            raise
+        _send_batch_signal(self, messages, None, result=result)
+        return result
+
+    return wrapper
 
 
 class BaseSmsBackend(object):
@@ -6,10 +133,106 @@ class BaseSmsBackend(object):
     Base class for sms backend implementations.
 
     Subclasses must at least overwrite send_messages()
+
+    The send_messages() and asend_messages() implementations of subclasses
+    are wrapped to send :py:data:`~sendsms.signals.sms_batch_sent` once per
+    call.
+
+    Transient errors are retried according to ``retry_policy`` (see
+    :py:mod:`sendsms.retry`), backends decide what is transient by
+    overwriting is_retryable_exception().
+
+    Network backends give up on a provider after ``timeout`` seconds, a
+    number or a ``(connect, read)`` tuple, and raise
+    :py:class:`~sendsms.exceptions.SmsTimeout`. The timeout is taken from the
+    ``timeout`` argument, ``SENDSMS_TIMEOUTS`` (by backend path) or
+    ``SENDSMS_TIMEOUT``, in that order.
+
+    Backends which can send one body to several recipients in a request
+    declare how many with ``max_recipients`` (None for no limit) and build
+    their requests with plan(). ``SENDSMS_MAX_RECIPIENTS`` overrides the
+    limit by backend path.
+
+    With ``SENDSMS_NORMALIZE_NUMBERS`` recipients are normalized (see
+    :py:mod:`sendsms.phone`) and formatted as ``phone_format`` while planning.
+    Invalid numbers raise InvalidPhoneNumber, or are skipped when failing
+    silently.
+
+    Settings::
+
+        SENDSMS_MAX_WORKERS = 1  # > 1 sends concurrently in a thread pool
+        SENDSMS_TIMEOUT = (5, 30)
+        SENDSMS_TIMEOUTS = {'sendsms.backends.bulksms.SmsBackend': (3, 60)}
+        SENDSMS_MAX_RECIPIENTS = {'sendsms.backends.esendex.SmsBackend': 50}
+        SENDSMS_NORMALIZE_NUMBERS = False
+        SENDSMS_DEFAULT_COUNTRY_CODE = None
     """
 
-    def __init__(self, fail_silently=False, **kwargs):
+    #: maximum number of recipients of a single provider request
+    max_recipients = None
+    #: number format the provider expects, see :py:mod:`sendsms.phone`
+    phone_format = phone.E164
+
+    def __init_subclass__(cls, **kwargs):
+        super(BaseSmsBackend, cls).__init_subclass__(**kwargs)
+        send_messages = cls.__dict__.get("send_messages")
+        if send_messages is not None and not getattr(
+            send_messages, "_batch_signal", False
+        ):
+            cls.send_messages = _batch_signal(send_messages)
+            cls.send_messages._batch_signal = True
+        asend_messages = cls.__dict__.get("asend_messages")
+        if asend_messages is not None and not getattr(
+            asend_messages, "_batch_signal", False
+        ):
+            cls.asend_messages = _async_batch_signal(asend_messages)
+            cls.asend_messages._batch_signal = True
+
+    def __init__(
+        self,
+        fail_silently=False,
+        max_workers=None,
+        retry_policy=None,
+        timeout=None,
+        max_recipients=None,
+        **kwargs
+    ):
         self.fail_silently = fail_silently
+        self.max_workers = max_workers or getattr(settings, "SENDSMS_MAX_WORKERS", 1)
+        self.retry_policy = retry_policy or RetryPolicy.from_settings()
+        self.timeout = timeout or self.get_default_timeout()
+        path = "%s.%s" % (type(self).__module__, type(self).__name__)
+        limits = getattr(settings, "SENDSMS_MAX_RECIPIENTS", {})
+        if max_recipients is not None:
+            self.max_recipients = max_recipients
+        elif path in limits:
+            # None lifts the limit of the class
+            self.max_recipients = limits[path]
+        self.normalize_numbers = getattr(settings, "SENDSMS_NORMALIZE_NUMBERS", False)
+        self.country_code = getattr(settings, "SENDSMS_DEFAULT_COUNTRY_CODE", None)
+
+    def get_default_timeout(self):
+        path = "%s.%s" % (type(self).__module__, type(self).__name__)
+        timeout = getattr(settings, "SENDSMS_TIMEOUTS", {}).get(path)
+        return timeout or getattr(settings, "SENDSMS_TIMEOUT", DEFAULT_TIMEOUT)
+
+    def is_retryable_exception(self, exception):
+        """
+        Return True if ``exception`` is a transient error worth retrying.
+
+        The default implementation only retries timeouts.
+        """
+        return isinstance(exception, SmsTimeout)
+
+    def is_timeout_exception(self, exception):
+        """
+        Return True if ``exception`` is a ``requests`` or ``httpx`` timeout.
+        """
+        requests = sys.modules.get("requests")
+        if requests is not None and isinstance(exception, requests.Timeout):
+            return True
+        httpx = sys.modules.get("httpx")
+        return httpx is not None and isinstance(exception, httpx.TimeoutException)
 
     def open(self):
         """
@@ -21,6 +244,10 @@ class BaseSmsBackend(object):
         This method can be called by applications to force a single
         network connection to be used when sending multiple SMSs.
 
+        Implementations should return True if a new connection was opened and
+        False if it was already open, so that callers only close what they
+        opened themselves.
+
         The default implementation does nothing.
         """
         pass
@@ -29,8 +256,435 @@ class BaseSmsBackend(object):
         """Close a network connection"""
         pass
 
+    def __enter__(self):
+        try:
+            self.open()
+        except Exception:
+            self.close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def send_messages(self, messages):
         """
         Sends one or more SmsMessage objects and returns the number of messages sent
         """
         raise NotImplementedError
+
+    async def asend_messages(self, messages):
+        """
+        Asynchronously send one or more SmsMessage objects and return the
+        number of messages sent.
+
+        Backends which only implement the sync contract run send_messages()
+        in a worker thread so the event loop is never blocked.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.send_messages, messages)
+
+    def format_phone(self, number):
+        """
+        Return ``number`` normalized and formatted as ``phone_format``, as is
+        unless ``SENDSMS_NORMALIZE_NUMBERS`` is set.
+
+        :raises InvalidPhoneNumber: if ``number`` is not a valid phone number
+        """
+        if not self.normalize_numbers:
+            return number
+        return phone.format_number(
+            phone.normalize(number, self.country_code), self.phone_format
+        )
+
+    def format_recipients(self, message):
+        """
+        Return the recipients of ``message`` formatted with format_phone().
+        Invalid numbers are skipped when failing silently.
+        """
+        recipients = []
+        for to in message.to:
+            try:
+                recipients.append(self.format_phone(to))
+            except InvalidPhoneNumber:
+                if not self.fail_silently:
+                    raise
+                logger.warning("Skipping invalid phone number %r", to)
+        return recipients
+
+    def plan(self, messages):
+        """
+        Plan the provider requests for ``messages``.
+
+        Messages with the same sender, body and flash setting are merged and
+        their recipients split into requests of at most ``max_recipients``,
+        which gives the fewest requests the provider allows. Recipients are
+        formatted with format_phone() first.
+
+        :returns: list of ``(request, entries)`` tuples. ``request`` is a
+            :py:class:`~sendsms.message.SmsMessage` to send as one request
+            (the original message if it is sent unchanged), ``entries`` the
+            ``(message, recipients)`` it covers.
+        """
+        from sendsms.message import SmsMessage
+
+        groups = collections.OrderedDict()
+        for message in messages:
+            if message.to:
+                key = (message.from_phone, message.body, message.flash)
+                groups.setdefault(key, []).append(message)
+
+        requests = []
+        for (from_phone, body, flash), group in groups.items():
+            pairs = [
+                (message, to)
+                for message in group
+                for to in self.format_recipients(message)
+            ]
+            size = self.max_recipients or len(pairs) or 1
+            for i in range(0, len(pairs), size):
+                entries = collections.OrderedDict()
+                for message, to in pairs[i : i + size]:
+                    entries.setdefault(message, []).append(to)
+                entries = list(entries.items())
+                message, to = entries[0]
+                if len(entries) == 1 and to == list(message.to):
+                    request = message
+                else:
+                    request = SmsMessage(
+                        body,
+                        from_phone=from_phone,
+                        to=[to for message, to in pairs[i : i + size]],
+                        flash=flash,
+                    )
+                requests.append((request, entries))
+        return requests
+
+    def _plan_outcomes(self, messages, requests, results):
+        """
+        Turn the results of planned requests into per-message outcomes.
+
+        A message is sent if every request covering it was.
+
+        :returns: list of bools, one per message
+        """
+        sent = {}
+        for (request, entries), result in zip(requests, results):
+            for message, to in entries:
+                sent[id(message)] = sent.get(id(message), True) and bool(result)
+        return [sent.get(id(message), False) for message in messages]
+
+    def _send_planned(self, send, messages):
+        """
+        Send the requests planned for ``messages`` with ``send`` (a callable
+        taking a message and returning a true value when it was accepted).
+
+        :returns: list of bools, one per message
+        """
+        requests = self.plan(messages)
+        try:
+            results = self._dispatch(send, [request for request, entries in requests])
+        except Exception as e:
+            self._set_outcomes(
+                self._plan_outcomes(messages, requests, e.dispatch_results)
+            )
+            raise
+        outcomes = self._plan_outcomes(messages, requests, results)
+        self._set_outcomes(outcomes)
+        return outcomes
+
+    async def _asend_planned(self, send, messages):
+        """
+        Asynchronous version of _send_planned(), ``send`` is a coroutine
+        function.
+        """
+        requests = self.plan(messages)
+        results = await self._adispatch(
+            send, [request for request, entries in requests]
+        )
+        return self._plan_outcomes(messages, requests, results)
+
+    def _set_outcomes(self, outcomes):
+        """
+        Record whether each message of the current send_messages() call was
+        sent, for :py:data:`~sendsms.signals.sms_batch_sent` receivers.
+
+        Must be called from the thread which called send_messages().
+        """
+        active = getattr(_batch_state, "active", None)
+        if active is not None and id(self) in active:
+            active[id(self)] = list(outcomes)
+
+    def _dispatch(self, func, items):
+        """
+        Call ``func`` for every item and return the results in the same order.
+
+        With ``max_workers`` greater than one the calls are made concurrently
+        in a thread pool. Every call is then completed before the exception of
+        the first failed item (in input order) is re-raised, so the raised
+        error does not depend on thread scheduling.
+
+        The raised exception gets a ``dispatch_results`` attribute holding the
+        results of the items which succeeded, None for the others.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        if self.max_workers <= 1 or len(items) <= 1:
+            for i, item in enumerate(items):
+                try:
+                    results[i] = func(item)
+                except Exception as e:
+                    e.dispatch_results = results
+                    raise
+            return results
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            futures = [pool.submit(func, item) for item in items]
+        error = None
+        for i, future in enumerate(futures):
+            if future.exception() is None:
+                results[i] = future.result()
+            elif error is None:
+                error = future.exception()
+        if error is not None:
+            error.dispatch_results = results
+            raise error
+        return results
+
+
+class AsyncBaseSmsBackend(BaseSmsBackend):
+    """
+    Base class for natively asynchronous sms backend implementations.
+
+    Subclasses must at least overwrite asend_messages(). Unless overwritten,
+    send_messages() runs asend_messages() to completion.
+    """
+
+    async def aopen(self):
+        """
+        Asynchronously open a network connection.
+
+        :returns: True if a new connection was opened.
+        """
+        return False
+
+    async def aclose(self):
+        """Asynchronously close a network connection"""
+        pass
+
+    async def __aenter__(self):
+        try:
+            await self.aopen()
+        except Exception:
+            await self.aclose()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    def send_messages(self, messages):
+        from asgiref.sync import async_to_sync
+
+        return async_to_sync(self.asend_messages)(messages)
+
+    # asend_messages() already sends the batch signal
+    send_messages._batch_signal = True
+
+    async def asend_messages(self, messages):
+        """
+        Asynchronously send one or more SmsMessage objects and return the
+        number of messages sent
+        """
+        raise NotImplementedError
+
+    async def _adispatch(self, func, items):
+        """
+        Await the coroutine function ``func`` for every item and return the
+        results in the same order.
+
+        This is the asynchronous counterpart of _dispatch(): with
+        ``max_workers`` greater than one up to that many calls run
+        concurrently, otherwise items are sent one after the other.
+        """
+        items = list(items)
+        if self.max_workers <= 1 or len(items) <= 1:
+            return [await func(item) for item in items]
+
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def call(item):
+            async with semaphore:
+                return await func(item)
+
+        results = await asyncio.gather(
+            *[call(item) for item in items], return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
+
+
+class HttpSmsBackend(BaseSmsBackend):
+    """
+    Base class for backends talking to an HTTP API through ``requests``.
+
+    open() creates a pooled ``requests.Session`` which is reused for every
+    request until close() is called, so a whole batch (or several batches on
+    an explicitly opened connection) share kept-alive connections.
+
+    Settings::
+
+        SENDSMS_HTTP_POOL_CONNECTIONS = 10  # number of hosts to keep pools for
+        SENDSMS_HTTP_POOL_MAXSIZE = 10  # connections kept alive per host
+
+    The pool size defaults to at least ``SENDSMS_MAX_WORKERS`` so concurrent
+    sends don't discard connections.
+    """
+
+    def __init__(
+        self, fail_silently=False, pool_connections=None, pool_maxsize=None, **kwargs
+    ):
+        super(HttpSmsBackend, self).__init__(fail_silently=fail_silently, **kwargs)
+        self.pool_connections = pool_connections or getattr(
+            settings, "SENDSMS_HTTP_POOL_CONNECTIONS", 10
+        )
+        self.pool_maxsize = pool_maxsize or getattr(
+            settings, "SENDSMS_HTTP_POOL_MAXSIZE", max(10, self.max_workers)
+        )
+        self.session = None
+
+    def open(self):
+        """
+        Create the pooled HTTP session.
+
+        :returns: True if a new session was created, False if already open.
+        """
+        if self.session is not None:
+            return False
+
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        return True
+
+    def close(self):
+        """Release the pooled HTTP session"""
+        if self.session is None:
+            return
+        try:
+            self.session.close()
+        finally:
+            self.session = None
+
+    def is_retryable_exception(self, exception):
+        """
+        Connection errors and timeouts of ``requests`` and ``httpx`` are
+        transient.
+        """
+        import requests
+
+        if isinstance(exception, (requests.ConnectionError, requests.Timeout)):
+            return True
+        httpx = sys.modules.get("httpx")
+        if httpx is not None and isinstance(exception, httpx.TransportError):
+            return True
+        return super(HttpSmsBackend, self).is_retryable_exception(exception)
+
+    def is_retryable_response(self, response):
+        """
+        Return True if ``response`` is a transient failure worth retrying:
+        a server error or "429 Too Many Requests".
+        """
+        return response.status_code >= 500 or response.status_code == 429
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request through the pooled session, retrying transient
+        failures according to the retry policy.
+
+        The backend must have been opened before.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            return self.retry_policy.call(
+                lambda: self.session.request(method, url, **kwargs),
+                retry_on_exception=self.is_retryable_exception,
+                retry_on_result=self.is_retryable_response,
+            )
+        except Exception as e:
+            if self.is_timeout_exception(e):
+                raise SmsTimeout(
+                    "Request to %s timed out" % urlsplit(url).netloc
+                ) from e
+            raise
+
+
+class AsyncHttpSmsBackend(HttpSmsBackend, AsyncBaseSmsBackend):
+    """
+    Base class for HTTP backends which can also send through an asyncio
+    ``httpx.AsyncClient``.
+
+    aopen() and aclose() manage the async client the same way open() and
+    close() manage the ``requests.Session``, sharing the pool settings.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(AsyncHttpSmsBackend, self).__init__(*args, **kwargs)
+        self.async_client = None
+
+    async def aopen(self):
+        """
+        Create the pooled async HTTP client.
+
+        :returns: True if a new client was created, False if already open.
+        """
+        if self.async_client is not None:
+            return False
+
+        import httpx
+
+        connect, read = split_timeout(self.timeout)
+        self.async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.pool_maxsize,
+                max_keepalive_connections=self.pool_maxsize,
+            ),
+            timeout=httpx.Timeout(read, connect=connect),
+        )
+        return True
+
+    async def aclose(self):
+        """Release the pooled async HTTP client"""
+        if self.async_client is None:
+            return
+        try:
+            await self.async_client.aclose()
+        finally:
+            self.async_client = None
+
+    async def arequest(self, method, url, **kwargs):
+        """
+        Send a request through the async client.
+
+        The backend must have been opened with aopen() before.
+        """
+        try:
+            return await self.retry_policy.acall(
+                lambda: self.async_client.request(method, url, **kwargs),
+                retry_on_exception=self.is_retryable_exception,
+                retry_on_result=self.is_retryable_response,
+            )
+        except Exception as e:
+            if self.is_timeout_exception(e):
+                raise SmsTimeout(
+                    "Request to %s timed out" % urlsplit(url).netloc
+                ) from e
+            raise
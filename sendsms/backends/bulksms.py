@@ -2,17 +2,13 @@
 
 from django.conf import settings
 
-import requests
-
-from sendsms.backends.base import BaseSmsBackend
+from sendsms.backends.base import AsyncHttpSmsBackend
+from sendsms.encoding import UCS2
 
 BULKSMS_API_URL = "https://api.bulksms.com/v1/messages"
-BULKSMS_TOKEN_ID = getattr(settings, "SENDSMS_BULKSMS_TOKEN_ID", "")
-BULKSMS_TOKEN_SECRET = getattr(settings, "SENDSMS_BULKSMS_TOKEN_SECRET", "")
-BULKSMS_ENABLE_UNICODE = getattr(settings, "SENDSMS_BULKSMS_ENABLE_UNICODE", True)
 
 
-class SmsBackend(BaseSmsBackend):
+class SmsBackend(AsyncHttpSmsBackend):
     """
     BulkSMS gateway backend. (http://www.bulksms.com)
     Docs in https://www.bulksms.com/developer/json/v1/
@@ -22,7 +18,11 @@ class SmsBackend(BaseSmsBackend):
         SENDSMS_BACKEND = 'sendsms.backends.bulksms.SmsBackend'
         SENDSMS_BULKSMS_TOKEN_ID = 'xxx'
         SENDSMS_BULKSMS_TOKEN_SECRET = 'xxx'
-        BULKSMS_ENABLE_UNICODE = True (default)
+        SENDSMS_BULKSMS_ENABLE_UNICODE = True (default, used for non GSM-7 bodies only)
+
+    Messages are posted in requests of at most 1000 recipients (see
+    ``SENDSMS_MAX_RECIPIENTS``), concurrently if SENDSMS_MAX_WORKERS is set.
+    The ids BulkSMS assigns are attached to each message as ``provider_ids``.
 
     Usage::
         from sendsms import api
@@ -32,24 +32,128 @@ class SmsBackend(BaseSmsBackend):
 
     """
 
-    def send_messages(self, messages):
-        payload = []
-        for m in messages:
-            entry = {"from": m.from_phone, "to": m.to, "body": m.body}
-            if BULKSMS_ENABLE_UNICODE:
-                entry["encoding"] = "UNICODE"
-            payload.append(entry)
-
-        response = requests.post(
-            BULKSMS_API_URL, json=payload, auth=(BULKSMS_TOKEN_ID, BULKSMS_TOKEN_SECRET)
+    max_recipients = 1000
+
+    def __init__(self, fail_silently=False, **kwargs):
+        super(SmsBackend, self).__init__(fail_silently=fail_silently, **kwargs)
+        self.auth = (
+            getattr(settings, "SENDSMS_BULKSMS_TOKEN_ID", ""),
+            getattr(settings, "SENDSMS_BULKSMS_TOKEN_SECRET", ""),
         )
+        self.enable_unicode = getattr(settings, "SENDSMS_BULKSMS_ENABLE_UNICODE", True)
+
+    def _get_payload(self, request):
+        entry = {
+            "from": request.from_phone,
+            "to": list(request.to),
+            "body": request.body,
+        }
+        if self.enable_unicode and request.encoding == UCS2:
+            entry["encoding"] = "UNICODE"
+        return [entry]
 
+    def _handle_response(self, response, entries):
+        """
+        Check the response to a posted request covering ``entries``, the
+        ``(message, recipients)`` tuples planned for it.
+
+        BulkSMS answers with one entry per recipient, in request order.
+
+        :returns: list of (message, sent, ids) tuples, one per entry
+        """
         if response.status_code != 201:
             if self.fail_silently:
-                return False
+                return [(message, False, []) for message, to in entries]
             raise Exception(
                 "Error: %d: %s"
                 % (response.status_code, response.content.decode("utf-8"))
             )
 
-        return True
+        try:
+            results = response.json()
+        except ValueError:
+            results = None
+        if not isinstance(results, list) or len(results) != sum(
+            len(to) for message, to in entries
+        ):
+            return [(message, True, []) for message, to in entries]
+
+        outcome = []
+        index = 0
+        for message, to in entries:
+            answers = results[index : index + len(to)]
+            index += len(to)
+            ids = [a["id"] for a in answers if a.get("id")]
+            sent = all((a.get("status") or {}).get("type") != "FAILED" for a in answers)
+            outcome.append((message, sent, ids))
+        return outcome
+
+    def _count_sent(self, messages, requests, results):
+        """
+        Attach the returned ids to the messages, in request order, and count
+        the messages sent.
+
+        Requests may have been sent concurrently, so this is only done once
+        all of them returned.
+        """
+        sent, failed = set(), set()
+        for (request, entries), outcome in zip(requests, results):
+            if outcome is None:
+                # the request raised
+                outcome = [(message, False, []) for message, to in entries]
+            for message, ok, ids in outcome:
+                (sent if ok else failed).add(id(message))
+                if ids:
+                    if message.provider_ids is None:
+                        message.provider_ids = []
+                    message.provider_ids.extend(ids)
+        outcomes = [id(m) in sent and id(m) not in failed for m in messages]
+        self._set_outcomes(outcomes)
+        return outcomes.count(True)
+
+    def _send_request(self, planned):
+        request, entries = planned
+        response = self.request(
+            "POST",
+            BULKSMS_API_URL,
+            json=self._get_payload(request),
+            auth=self.auth,
+        )
+        return self._handle_response(response, entries)
+
+    async def _asend_request(self, planned):
+        request, entries = planned
+        response = await self.arequest(
+            "POST",
+            BULKSMS_API_URL,
+            json=self._get_payload(request),
+            auth=self.auth,
+        )
+        return self._handle_response(response, entries)
+
+    def send_messages(self, messages):
+        messages = list(messages)
+        requests = self.plan(messages)
+        new_conn_created = self.open()
+        try:
+            results = self._dispatch(self._send_request, requests)
+        except Exception as e:
+            self._count_sent(messages, requests, e.dispatch_results)
+            raise
+        finally:
+            if new_conn_created:
+                self.close()
+
+        return self._count_sent(messages, requests, results)
+
+    async def asend_messages(self, messages):
+        messages = list(messages)
+        requests = self.plan(messages)
+        new_conn_created = await self.aopen()
+        try:
+            results = await self._adispatch(self._asend_request, requests)
+        finally:
+            if new_conn_created:
+                await self.aclose()
+
+        return self._count_sent(messages, requests, results)
@@ -7,6 +7,11 @@ configured.
 
 This backend is based on the rq backend.
 
+Messages are queued in their compact :py:meth:`SmsMessage.to_dict` form, in
+chunks of ``CELERY_SENDSMS_CHUNK_SIZE`` messages. Several chunks are queued
+as a celery group, so they are sent by several workers in parallel. Each
+worker process keeps one open connection to ``CELERY_SENDSMS_BACKEND``.
+
 Usage
 -----
 
@@ -15,31 +20,61 @@ In settings.py
 
     SENDSMS_BACKEND = 'sendsms.backends.celery.SmsBackend'
     CELERY_SENDSMS_BACKEND = 'actual.backend.to.use.SmsBackend'
+    CELERY_SENDSMS_CHUNK_SIZE = 100  # default
 
 
 """
+
 from __future__ import absolute_import
 
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 
-from celery import shared_task
+from celery import group, shared_task
 
-from sendsms.api import get_connection
+from sendsms.api import count_sent, get_worker_connection
 from sendsms.backends.base import BaseSmsBackend
+from sendsms.message import SmsMessage
 
-CELERY_SENDSMS_BACKEND = getattr(settings, "CELERY_SENDSMS_BACKEND", None)
 
-if not CELERY_SENDSMS_BACKEND:
-    raise ImproperlyConfigured("Set CELERY_SENDSMS_BACKEND")
+def get_backend_path():
+    path = getattr(settings, "CELERY_SENDSMS_BACKEND", None)
+    if not path:
+        raise ImproperlyConfigured("Set CELERY_SENDSMS_BACKEND")
+    return path
 
 
 @shared_task
 def send_messages(messages):
-    connection = get_connection(CELERY_SENDSMS_BACKEND)
-    connection.send_messages(messages)
+    # SmsMessage instances are accepted for tasks queued by older versions
+    messages = [
+        m if isinstance(m, SmsMessage) else SmsMessage.from_dict(m) for m in messages
+    ]
+    connection = get_worker_connection(get_backend_path())
+    return count_sent(connection.send_messages(messages), messages)
 
 
 class SmsBackend(BaseSmsBackend):
+    def __init__(self, fail_silently=False, chunk_size=None, **kwargs):
+        super(SmsBackend, self).__init__(fail_silently=fail_silently, **kwargs)
+        get_backend_path()
+        self.chunk_size = chunk_size or getattr(
+            settings, "CELERY_SENDSMS_CHUNK_SIZE", 100
+        )
+
     def send_messages(self, messages):
-        send_messages.delay(messages)
+        """
+        Queue the messages.
+
+        :returns: the number of messages queued.
+        """
+        payload = [message.to_dict() for message in messages]
+        chunks = [
+            payload[i : i + self.chunk_size]
+            for i in range(0, len(payload), self.chunk_size)
+        ]
+        if len(chunks) == 1:
+            send_messages.delay(chunks[0])
+        elif chunks:
+            group([send_messages.s(chunk) for chunk in chunks]).apply_async()
+        return len(payload)
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""circuit breaker backend
+
+This backend wraps another backend and stops calling it while it is down,
+so workers fail fast instead of piling up on a dead provider.
+
+The circuit is:
+
+* closed: batches are sent; calls and failures are counted per ``window``
+  seconds. Once at least ``minimum_calls`` were made and the share of
+  failed ones reaches ``failure_rate``, the circuit opens.
+* open: for ``cooldown`` seconds nothing is sent to the backend. Batches go
+  to the fallback backend if one is configured, otherwise
+  :py:class:`~sendsms.exceptions.CircuitOpenError` is raised (or 0 returned
+  with ``fail_silently``).
+* half-open: after the cooldown a single trial batch is let through. Success
+  closes the circuit, failure opens it again. Batches which were started
+  before the circuit opened don't close it when they succeed.
+
+The state lives in Django's cache, so with a shared cache (memcached,
+redis, database) all processes see a circuit opened by any of them.
+
+Usage
+-----
+
+In settings.py
+
+    SENDSMS_BACKEND = 'sendsms.backends.circuitbreaker.SmsBackend'
+    CIRCUITBREAKER_SENDSMS_BACKEND = 'actual.backend.to.use.SmsBackend'
+    CIRCUITBREAKER_SENDSMS_FALLBACK_BACKEND = 'other.backend.SmsBackend'  # optional
+    SENDSMS_CIRCUIT_BREAKER = {
+        'failure_rate': 0.5,
+        'minimum_calls': 10,
+        'window': 60,
+        'cooldown': 30,
+        'cache': 'default',
+    }
+
+"""
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from sendsms.api import get_connection
+from sendsms.backends.base import BaseSmsBackend
+from sendsms.exceptions import CircuitOpenError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker(object):
+    def __init__(
+        self,
+        name,
+        cache,
+        failure_rate=0.5,
+        minimum_calls=10,
+        window=60,
+        cooldown=30,
+        clock=time.time,
+    ):
+        self.key = "sendsms:circuit:%s" % name
+        self.cache = cache
+        self.failure_rate = failure_rate
+        self.minimum_calls = minimum_calls
+        self.window = window
+        self.cooldown = cooldown
+        self.clock = clock
+
+    @property
+    def state(self):
+        opened_until = self.cache.get(self.key + ":open")
+        if opened_until is None:
+            return CLOSED
+        if self.clock() < opened_until:
+            return OPEN
+        return HALF_OPEN
+
+    def allow(self):
+        """
+        Return whether a batch may be sent to the backend now: False, or the
+        state it is let through in, HALF_OPEN for the single trial batch.
+        """
+        state = self.state
+        if state == CLOSED:
+            return CLOSED
+        # only one process gets the trial batch
+        if state == HALF_OPEN and self.cache.add(
+            self.key + ":trial", 1, timeout=self.cooldown
+        ):
+            return HALF_OPEN
+        return False
+
+    def record_success(self, trial=False):
+        """
+        Record a successful batch, ``trial`` if it was the half-open trial.
+        """
+        if trial:
+            self.close()
+        elif self.state == CLOSED:
+            self._count(failed=False)
+
+    def record_failure(self, trial=False):
+        """
+        Record a failed batch, ``trial`` if it was the half-open trial.
+        """
+        if trial or self.state != CLOSED:
+            self.open()
+            return
+        calls, failures = self._count(failed=True)
+        if calls >= self.minimum_calls and failures >= calls * self.failure_rate:
+            self.open()
+
+    def open(self):
+        self.cache.set(self.key + ":open", self.clock() + self.cooldown, timeout=None)
+        self.cache.delete(self.key + ":trial")
+
+    def close(self):
+        self.cache.delete_many([self.key + ":open", self.key + ":trial"])
+
+    def _count(self, failed):
+        window = int(self.clock() // self.window)
+        keys = ["%s:calls:%d" % (self.key, window)]
+        if failed:
+            keys.append("%s:failures:%d" % (self.key, window))
+        counts = []
+        for key in keys:
+            self.cache.add(key, 0, timeout=self.window * 2)
+            try:
+                counts.append(self.cache.incr(key))
+            except ValueError:
+                counts.append(1)
+        if not failed:
+            counts.append(0)
+        return counts
+
+
+class SmsBackend(BaseSmsBackend):
+    def __init__(self, fail_silently=False, **kwargs):
+        super(SmsBackend, self).__init__(fail_silently=fail_silently, **kwargs)
+        path = getattr(settings, "CIRCUITBREAKER_SENDSMS_BACKEND", None)
+        if not path:
+            raise ImproperlyConfigured("Set CIRCUITBREAKER_SENDSMS_BACKEND")
+        self.path = path
+        self.connection = get_connection(path)
+
+        fallback = getattr(settings, "CIRCUITBREAKER_SENDSMS_FALLBACK_BACKEND", None)
+        self.fallback = (
+            get_connection(fallback, fail_silently=fail_silently) if fallback else None
+        )
+
+        from django.core.cache import caches
+
+        options = dict(getattr(settings, "SENDSMS_CIRCUIT_BREAKER", {}))
+        cache = caches[options.pop("cache", "default")]
+        self.breaker = CircuitBreaker(path, cache, **options)
+
+    def open(self):
+        new_conn_created = self.connection.open()
+        if self.fallback is not None:
+            new_conn_created = self.fallback.open() or new_conn_created
+        return new_conn_created
+
+    def close(self):
+        self.connection.close()
+        if self.fallback is not None:
+            self.fallback.close()
+
+    def send_messages(self, messages):
+        allowed = self.breaker.allow()
+        if not allowed:
+            if self.fallback is not None:
+                return self.fallback.send_messages(messages)
+            if self.fail_silently:
+                return 0
+            raise CircuitOpenError("Circuit for %s is open" % self.path)
+
+        try:
+            result = self.connection.send_messages(messages)
+        except Exception:
+            self.breaker.record_failure(trial=allowed == HALF_OPEN)
+            if self.fail_silently:
+                return 0
+            raise
+        self.breaker.record_success(trial=allowed == HALF_OPEN)
+        return result
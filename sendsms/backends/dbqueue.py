@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""database queue backend
+
+This backend stores the messages in the database instead of sending them,
+``python manage.py sendsms_dispatch`` sends them later through
+``DBQUEUE_SENDSMS_BACKEND``. Messages survive crashes and web requests don't
+wait for the provider.
+
+Each send_messages() call is a single INSERT.
+
+Usage
+-----
+
+In settings.py
+
+    INSTALLED_APPS += ['sendsms.dbqueue']
+    SENDSMS_BACKEND = 'sendsms.backends.dbqueue.SmsBackend'
+    DBQUEUE_SENDSMS_BACKEND = 'actual.backend.to.use.SmsBackend'
+
+"""
+
+from sendsms.backends.base import BaseSmsBackend
+
+
+class SmsBackend(BaseSmsBackend):
+    def send_messages(self, messages):
+        """
+        Queue the messages.
+
+        :returns: the number of messages queued.
+        """
+        from sendsms.dbqueue.models import OutboundSms
+
+        rows = [OutboundSms.from_message(message) for message in messages]
+        OutboundSms.objects.bulk_create(rows)
+        return len(rows)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""deduplication backend
+
+This backend wraps another backend and drops messages which were already
+sent within the last ``window`` seconds, before any network I/O. This
+covers task retries (celery, rq) and users submitting a form twice.
+
+A message is identified by its ``idempotency_key`` if it has one, otherwise
+by a hash of its sender, recipients and body.
+
+Keys are remembered in a bounded in-process LRU and, if ``cache`` is set, in
+Django's cache so processes sharing that cache also share the keys. The keys
+of messages which were not reported as sent (the backend raised, failed
+silently or rejected them) are forgotten again, so they can be retried.
+
+Usage
+-----
+
+In settings.py
+
+    SENDSMS_BACKEND = 'sendsms.backends.dedup.SmsBackend'
+    DEDUP_SENDSMS_BACKEND = 'actual.backend.to.use.SmsBackend'
+    SENDSMS_DEDUP = {
+        'window': 300,  # seconds
+        'lru_size': 10000,
+        'cache': 'default',  # None to only deduplicate within the process
+    }
+
+"""
+import collections
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from sendsms.api import get_connection
+from sendsms.backends.base import BaseSmsBackend, track_outcomes
+
+logger = logging.getLogger(__name__)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_dedup_key(message):
+    """
+    Return the idempotency key of ``message``, or a hash of its content.
+    """
+    if message.idempotency_key:
+        return "key:%s" % message.idempotency_key
+    content = "\0".join(
+        [message.from_phone or "", ",".join(message.to), message.body or ""]
+    )
+    return "hash:%s" % hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class DedupStore(object):
+    """
+    Remembers keys for ``window`` seconds, in an LRU of at most ``lru_size``
+    keys and optionally in a Django cache.
+
+    ``suppressed`` and ``passed`` count the keys reported as duplicates and
+    as new.
+    """
+
+    def __init__(self, window=300, lru_size=10000, cache=None, clock=time.time):
+        self.window = window
+        self.lru_size = lru_size
+        self.cache = cache
+        self.clock = clock
+        self.suppressed = 0
+        self.passed = 0
+        self._seen = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cache_key(self, key):
+        return "sendsms:dedup:%s" % key
+
+    def check(self, key):
+        """
+        Remember ``key``.
+
+        :returns: True if the key was already seen within the window.
+        """
+        now = self.clock()
+        with self._lock:
+            expires = self._seen.get(key)
+            if expires is not None and expires > now:
+                self._seen.move_to_end(key)
+                self.suppressed += 1
+                return True
+            if self.cache is not None and not self.cache.add(
+                self._cache_key(key), 1, timeout=self.window
+            ):
+                self.suppressed += 1
+                return True
+            self._seen[key] = now + self.window
+            self._seen.move_to_end(key)
+            while len(self._seen) > self.lru_size:
+                self._seen.popitem(last=False)
+            self.passed += 1
+            return False
+
+    def forget(self, keys):
+        with self._lock:
+            for key in keys:
+                self._seen.pop(key, None)
+        if self.cache is not None:
+            self.cache.delete_many([self._cache_key(key) for key in keys])
+
+
+def get_store():
+    """
+    Return the store for the current ``SENDSMS_DEDUP`` settings, shared
+    within the process.
+    """
+    options = dict(getattr(settings, "SENDSMS_DEDUP", {}))
+    cache_alias = options.pop("cache", "default")
+    key = (cache_alias, tuple(sorted(options.items())))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            cache = None
+            if cache_alias:
+                from django.core.cache import caches
+
+                cache = caches[cache_alias]
+            store = _stores[key] = DedupStore(cache=cache, **options)
+        return store
+
+
+class SmsBackend(BaseSmsBackend):
+    def __init__(self, fail_silently=False, **kwargs):
+        super(SmsBackend, self).__init__(fail_silently=fail_silently, **kwargs)
+        path = getattr(settings, "DEDUP_SENDSMS_BACKEND", None)
+        if not path:
+            raise ImproperlyConfigured("Set DEDUP_SENDSMS_BACKEND")
+        self.connection = get_connection(path, fail_silently=fail_silently)
+        self.store = get_store()
+        self.suppressed = 0
+
+    def open(self):
+        return self.connection.open()
+
+    def close(self):
+        self.connection.close()
+
+    def send_messages(self, messages):
+        unique, keys = [], []
+        for message in messages:
+            key = get_dedup_key(message)
+            if self.store.check(key):
+                self.suppressed += 1
+                logger.info("Dropped duplicate SMS to %s", ",".join(message.to))
+                continue
+            unique.append(message)
+            keys.append(key)
+        if not unique:
+            return 0
+
+        with track_outcomes(self.connection, unique) as outcomes:
+            try:
+                return self.connection.send_messages(unique)
+            finally:
+                self.store.forget(
+                    [key for key, outcome in zip(keys, outcomes) if outcome is not True]
+                )
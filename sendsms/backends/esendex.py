@@ -26,18 +26,12 @@ Usage::
 
 from django.conf import settings
 
-import requests
-
-from .base import BaseSmsBackend
+from .base import AsyncHttpSmsBackend
 
 ESENDEX_API_URL = "https://www.esendex.com/secure/messenger/formpost/SendSMS.aspx"
-ESENDEX_USERNAME = getattr(settings, "ESENDEX_USERNAME", "")
-ESENDEX_PASSWORD = getattr(settings, "ESENDEX_PASSWORD", "")
-ESENDEX_ACCOUNT = getattr(settings, "ESENDEX_ACCOUNT", "")
-ESENDEX_SANDBOX = getattr(settings, "ESENDEX_SANDBOX", False)
 
 
-class SmsBackend(BaseSmsBackend):
+class SmsBackend(AsyncHttpSmsBackend):
     """
     SMS Backend for esendex.es provider.
 
@@ -46,14 +40,21 @@ class SmsBackend(BaseSmsBackend):
     class overrides the method "get_xxxx" to return data stored in the database.
     """
 
+    # recipients are posted comma separated in a single form field, keep
+    # requests small (raise it with SENDSMS_MAX_RECIPIENTS)
+    max_recipients = 100
+
     def get_username(self):
-        return ESENDEX_USERNAME
+        return getattr(settings, "ESENDEX_USERNAME", "")
 
     def get_password(self):
-        return ESENDEX_PASSWORD
+        return getattr(settings, "ESENDEX_PASSWORD", "")
 
     def get_account(self):
-        return ESENDEX_ACCOUNT
+        return getattr(settings, "ESENDEX_ACCOUNT", "")
+
+    def is_sandbox(self):
+        return getattr(settings, "ESENDEX_SANDBOX", False)
 
     def _parse_response(self, response):
         """
@@ -71,15 +72,7 @@ class SmsBackend(BaseSmsBackend):
             response_dict[key] = value
         return response_dict
 
-    def _send(self, message):
-        """
-        Private method to send one message.
-
-        :param SmsMessage message: SmsMessage class instance.
-        :returns: True if message is sent else False
-        :rtype: bool
-        """
-
+    def _get_params(self, message):
         params = {
             "EsendexUsername": self.get_username(),
             "EsendexPassword": self.get_password(),
@@ -89,10 +82,39 @@ class SmsBackend(BaseSmsBackend):
             "EsendexBody": message.body,
             "EsendexPlainText": "1",
         }
-        if ESENDEX_SANDBOX:
+        if self.is_sandbox():
             params["EsendexTest"] = "1"
+        return params
+
+    def _send(self, message):
+        """
+        Private method to send one message.
+
+        :param SmsMessage message: SmsMessage class instance.
+        :returns: True if message is sent else False
+        :rtype: bool
+        """
+
+        response = self.request("POST", ESENDEX_API_URL, data=self._get_params(message))
+        return self._handle_response(response)
+
+    async def _asend(self, message):
+        """
+        Asynchronous version of _send()
+        """
+
+        response = await self.arequest(
+            "POST", ESENDEX_API_URL, data=self._get_params(message)
+        )
+        return self._handle_response(response)
 
-        response = requests.post(ESENDEX_API_URL, params)
+    def _handle_response(self, response):
+        """
+        Check the http response of a sent message.
+
+        :returns: True if message is sent else False
+        :rtype: bool
+        """
         if response.status_code != 200:
             if not self.fail_silently:
                 raise Exception("Bad status code")
@@ -107,7 +129,7 @@ class SmsBackend(BaseSmsBackend):
 
         response = self._parse_response(response.content.decode("utf8"))
 
-        if ESENDEX_SANDBOX and response["Result"] == "Test":
+        if self.is_sandbox() and response["Result"] == "Test":
             return True
         else:
             if response["Result"].startswith("OK"):
@@ -126,10 +148,28 @@ class SmsBackend(BaseSmsBackend):
         :returns: number of messages sended successful.
         :rtype: int
         """
-        counter = 0
-        for message in messages:
-            res = self._send(message)
-            if res:
-                counter += 1
+        new_conn_created = self.open()
+        try:
+            outcomes = self._send_planned(self._send, messages)
+        finally:
+            if new_conn_created:
+                self.close()
+
+        return outcomes.count(True)
+
+    async def asend_messages(self, messages):
+        """
+        Asynchronously send messages.
 
-        return counter
+        :param list messages: List of SmsMessage instances.
+        :returns: number of messages sended successful.
+        :rtype: int
+        """
+        new_conn_created = await self.aopen()
+        try:
+            outcomes = await self._asend_planned(self._asend, messages)
+        finally:
+            if new_conn_created:
+                await self.aclose()
+
+        return outcomes.count(True)
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""failover / load balancing backend
+
+This backend spreads messages over several backends and fails over to the
+next one when a backend raises.
+
+Each message is routed to a backend according to the strategy, the
+messages routed to the same backend are sent as one batch. When a batch
+raises, the messages the backend did not report as sent are sent again
+through the next healthy backend. Backends which don't report per-message
+outcomes (see :py:data:`~sendsms.signals.sms_batch_sent`) get the whole batch
+sent again, so delivery is at-least-once for them.
+
+A backend which failed ``SENDSMS_FAILOVER_FAILURE_THRESHOLD`` times in a row
+(raising, or failing silently without sending anything) is bypassed for
+``SENDSMS_FAILOVER_COOLDOWN`` seconds, then gets a single trial batch again.
+Health and latency are tracked per process.
+
+Strategies:
+
+* ``priority``: always the first healthy backend of the list
+* ``round_robin``: healthy backends in turn
+* ``weighted``: random choice by ``SENDSMS_FAILOVER_WEIGHTS``
+* ``least_latency``: the backend with the lowest average time per message over
+  the last ``SENDSMS_FAILOVER_LATENCY_WINDOW`` batches
+
+Usage
+-----
+
+In settings.py
+
+    SENDSMS_BACKEND = 'sendsms.backends.failover.SmsBackend'
+    FAILOVER_SENDSMS_BACKENDS = [
+        'sendsms.backends.bulksms.SmsBackend',
+        'sendsms.backends.nexmo.SmsBackend',
+    ]
+    SENDSMS_FAILOVER_STRATEGY = 'priority'  # default
+    SENDSMS_FAILOVER_WEIGHTS = {'sendsms.backends.bulksms.SmsBackend': 3}
+    SENDSMS_FAILOVER_FAILURE_THRESHOLD = 3
+    SENDSMS_FAILOVER_COOLDOWN = 30
+
+"""
+
+import collections
+import itertools
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from sendsms.api import count_sent, get_connection
+from sendsms.backends.base import BaseSmsBackend, track_outcomes
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("priority", "round_robin", "weighted", "least_latency")
+
+_health = {}
+_health_lock = threading.Lock()
+_round_robin = itertools.count()
+
+
+class BackendHealth(object):
+    """
+    Consecutive failures, bypass deadline and recent latencies of a backend.
+    """
+
+    def __init__(self, window=20, clock=time.monotonic):
+        self.failures = 0
+        self.bypass_until = 0
+        self.cooldown = 0
+        self.latencies = collections.deque(maxlen=window)
+        self.clock = clock
+        self._lock = threading.Lock()
+
+    def is_available(self):
+        return self.clock() >= self.bypass_until
+
+    def claim(self):
+        """
+        Claim the backend for a batch. Once the cooldown of a bypassed
+        backend is over, only the first caller gets it for a trial batch.
+        """
+        with self._lock:
+            now = self.clock()
+            if now < self.bypass_until:
+                return False
+            if self.bypass_until:
+                # claim the trial, the others wait for its outcome
+                self.bypass_until = now + self.cooldown
+            return True
+
+    def record_success(self, latency):
+        with self._lock:
+            self.failures = 0
+            self.bypass_until = 0
+            self.latencies.append(latency)
+
+    def record_failure(self, threshold, cooldown):
+        with self._lock:
+            self.failures += 1
+            self.cooldown = cooldown
+            if self.failures >= threshold:
+                self.bypass_until = self.clock() + cooldown
+
+    @property
+    def latency(self):
+        if not self.latencies:
+            return 0
+        return sum(self.latencies) / len(self.latencies)
+
+
+def get_health(path):
+    with _health_lock:
+        health = _health.get(path)
+        if health is None:
+            health = _health[path] = BackendHealth(
+                getattr(settings, "SENDSMS_FAILOVER_LATENCY_WINDOW", 20)
+            )
+        return health
+
+
+class SmsBackend(BaseSmsBackend):
+    def __init__(self, fail_silently=False, **kwargs):
+        super(SmsBackend, self).__init__(fail_silently=fail_silently, **kwargs)
+        self.paths = list(getattr(settings, "FAILOVER_SENDSMS_BACKENDS", []))
+        if not self.paths:
+            raise ImproperlyConfigured("Set FAILOVER_SENDSMS_BACKENDS")
+        self.strategy = getattr(settings, "SENDSMS_FAILOVER_STRATEGY", "priority")
+        if self.strategy not in STRATEGIES:
+            raise ImproperlyConfigured(
+                "SENDSMS_FAILOVER_STRATEGY must be one of %s" % ", ".join(STRATEGIES)
+            )
+        weights = getattr(settings, "SENDSMS_FAILOVER_WEIGHTS", {})
+        self.weights = [weights.get(path, 1) for path in self.paths]
+        self.failure_threshold = getattr(
+            settings, "SENDSMS_FAILOVER_FAILURE_THRESHOLD", 3
+        )
+        self.cooldown = getattr(settings, "SENDSMS_FAILOVER_COOLDOWN", 30)
+        self.connections = {}
+        self._opened = False
+
+    def get_backend(self, path):
+        connection = self.connections.get(path)
+        if connection is None:
+            connection = self.connections[path] = get_connection(path)
+            if self._opened:
+                connection.open()
+        return connection
+
+    def open(self):
+        if self._opened:
+            return False
+        self._opened = True
+        for connection in self.connections.values():
+            connection.open()
+        return True
+
+    def close(self):
+        self._opened = False
+        for connection in self.connections.values():
+            connection.close()
+
+    def _route(self, paths):
+        """
+        Return the backend path for the next message.
+        """
+        if self.strategy == "round_robin":
+            return paths[next(_round_robin) % len(paths)]
+        if self.strategy == "weighted":
+            weights = [self.weights[self.paths.index(path)] for path in paths]
+            return random.choices(paths, weights)[0]
+        if self.strategy == "least_latency":
+            return min(paths, key=lambda path: get_health(path).latency)
+        return paths[0]
+
+    def _send_batch(self, path, messages):
+        """
+        Send ``messages`` through the backend at ``path``.
+
+        :returns: (number of messages sent, per-message outcomes) where the
+            outcomes are True/False/None (not known). The exception raised by
+            the backend gets the outcomes as ``outcomes`` attribute.
+        """
+        health = get_health(path)
+        connection = self.get_backend(path)
+        start = time.monotonic()
+        with track_outcomes(connection, messages) as outcomes:
+            try:
+                result = connection.send_messages(messages)
+            except Exception as e:
+                logger.warning("Sending through %s failed", path, exc_info=True)
+                health.record_failure(self.failure_threshold, self.cooldown)
+                e.outcomes = outcomes
+                raise
+        sent = count_sent(result, messages)
+        if messages and not sent:
+            logger.warning("Nothing was sent through %s", path)
+            health.record_failure(self.failure_threshold, self.cooldown)
+        else:
+            health.record_success((time.monotonic() - start) / max(1, len(messages)))
+        return sent, outcomes
+
+    def send_messages(self, messages):
+        paths = [path for path in self.paths if get_health(path).is_available()]
+        # if every backend is bypassed, all of them are tried anyway
+        force = not paths
+        paths = paths or list(self.paths)
+        batches = collections.OrderedDict()
+        for message in messages:
+            batches.setdefault(self._route(paths), []).append(message)
+
+        outcomes = {}
+        sent = 0
+        new_conn_created = self.open()
+        try:
+            for path, batch in batches.items():
+                sent += self._send_with_failover(path, batch, paths, outcomes, force)
+        finally:
+            self._set_outcomes(outcomes.get(id(message)) for message in messages)
+            if new_conn_created:
+                self.close()
+        return sent
+
+    def _send_with_failover(self, path, messages, paths, outcomes, force=False):
+        """
+        Send ``messages`` through ``path``. When it raises, the messages not
+        reported as sent are sent through the next backend. Unless ``force``
+        is set, backends whose trial batch another caller holds are skipped.
+
+        Records the outcome of every message in ``outcomes`` by id.
+
+        :returns: number of messages sent
+        """
+        candidates = [path] + [p for p in paths if p != path]
+        sent = 0
+        error = None
+        for candidate in candidates:
+            if not force and not get_health(candidate).claim():
+                continue
+            try:
+                count, batch_outcomes = self._send_batch(candidate, messages)
+            except Exception as e:
+                error = e
+                batch_outcomes = e.outcomes
+                outcomes.update(
+                    (id(message), outcome)
+                    for message, outcome in zip(messages, batch_outcomes)
+                )
+                sent += batch_outcomes.count(True)
+                messages = [
+                    message
+                    for message, outcome in zip(messages, batch_outcomes)
+                    if outcome is not True
+                ]
+                if not messages:
+                    return sent
+                continue
+            outcomes.update(
+                (id(message), outcome)
+                for message, outcome in zip(messages, batch_outcomes)
+            )
+            return sent + count
+
+        if error is None:
+            # every candidate was claimed by other callers
+            return self._send_with_failover(path, messages, paths, outcomes, True)
+        if self.fail_silently:
+            return sent
+        raise error
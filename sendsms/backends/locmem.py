@@ -3,10 +3,108 @@
 Backend for test environment.
 """
 
+import collections
+import threading
+
+from django.conf import settings
+
 import sendsms
 from sendsms.backends.base import BaseSmsBackend
 
 
+class Outbox(object):
+    """
+    The messages sent through the locmem backend, oldest first.
+
+    Keeps at most ``maxlen`` messages (no limit if None), dropping the oldest
+    ones. Messages are indexed by recipient and sender for sent_to() and
+    sent_from(). Adding messages is thread-safe.
+    """
+
+    def __init__(self, messages=(), maxlen=None):
+        self._lock = threading.Lock()
+        self._entries = collections.deque()
+        self._by_recipient = {}
+        self._by_sender = {}
+        self.maxlen = maxlen
+        self.extend(messages)
+
+    def _add(self, message):
+        # numbers are stored with the entry, the message may change later on
+        recipients = tuple(dict.fromkeys(message.to))
+        self._entries.append((message, recipients, message.from_phone))
+        for to in recipients:
+            self._by_recipient.setdefault(to, collections.deque()).append(message)
+        self._by_sender.setdefault(message.from_phone, collections.deque()).append(
+            message
+        )
+        if self.maxlen is not None and len(self._entries) > self.maxlen:
+            self._evict()
+
+    def _evict(self):
+        message, recipients, from_phone = self._entries.popleft()
+        for index, keys in (
+            (self._by_recipient, recipients),
+            (self._by_sender, (from_phone,)),
+        ):
+            for key in keys:
+                index[key].popleft()
+                if not index[key]:
+                    del index[key]
+
+    def append(self, message):
+        with self._lock:
+            self._add(message)
+
+    def extend(self, messages):
+        with self._lock:
+            for message in messages:
+                self._add(message)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_recipient.clear()
+            self._by_sender.clear()
+
+    def sent_to(self, number):
+        """Return the messages sent to ``number``, oldest first."""
+        with self._lock:
+            return list(self._by_recipient.get(number, ()))
+
+    def sent_from(self, number):
+        """Return the messages sent from ``number``, oldest first."""
+        with self._lock:
+            return list(self._by_sender.get(number, ()))
+
+    def _messages(self):
+        with self._lock:
+            return [message for message, recipients, from_phone in self._entries]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._messages())
+
+    def __getitem__(self, index):
+        return self._messages()[index]
+
+    def __repr__(self):
+        return "<Outbox: %d messages>" % len(self)
+
+
+def reset_outbox(maxlen=None):
+    """
+    Replace ``sendsms.outbox`` with an empty outbox keeping at most
+    ``maxlen`` messages (``SENDSMS_OUTBOX_MAXLEN`` by default) and return it.
+    """
+    if maxlen is None:
+        maxlen = getattr(settings, "SENDSMS_OUTBOX_MAXLEN", None)
+    sendsms.outbox = Outbox(maxlen=maxlen)
+    return sendsms.outbox
+
+
 class SmsBackend(BaseSmsBackend):
     """
     A sms backend for use during test sessions.
@@ -14,12 +112,20 @@ class SmsBackend(BaseSmsBackend):
     The test connection stores messages in a dummy outbox,
     rather than sending them out on the wire.
     The dummy outbox is accessible through the outbox instance attribute.
+
+    The outbox is an :py:class:`Outbox` bounded by ``SENDSMS_OUTBOX_MAXLEN``
+    and emptied with reset_outbox(). A list assigned to ``sendsms.outbox`` is
+    still extended as is.
+
+    Settings::
+
+        SENDSMS_OUTBOX_MAXLEN = None  # number of messages kept, no limit
     """
 
     def __init__(self, *args, **kwargs):
         super(SmsBackend, self).__init__(*args, **kwargs)
         if not hasattr(sendsms, "outbox"):
-            sendsms.outbox = []
+            reset_outbox()
 
     def send_messages(self, messages):
         """Redirect messages to the dummy outbox"""
@@ -11,9 +11,7 @@ import logging
 
 from django.conf import settings
 
-import requests
-
-from .base import BaseSmsBackend
+from .base import AsyncHttpSmsBackend
 
 logger = logging.getLogger("nexmo")
 
@@ -40,8 +38,6 @@ class AuthenticationError(ClientError):
 
 
 NEXMO_API_URL = "https://rest.nexmo.com/sms/json"
-NEXMO_API_KEY = getattr(settings, "SENDSMS_ACCOUNT_SID", "")
-NEXMO_API_SECRET = getattr(settings, "SENDSMS_AUTH_TOKEN", "")
 
 
 nexmo_error_codes = {
@@ -122,12 +118,19 @@ nexmo_error_codes = {
 }
 
 
-class SmsBackend(BaseSmsBackend):
+# "Throttled", "Internal error" and "Communication Failed" are worth retrying
+NEXMO_RETRYABLE_STATUS_CODES = (1, 5, 13)
+
+
+class SmsBackend(AsyncHttpSmsBackend):
+    # the SMS API takes a single number in ``to``
+    max_recipients = 1
+
     def get_api_key(self):
-        return NEXMO_API_KEY
+        return getattr(settings, "SENDSMS_ACCOUNT_SID", "")
 
     def get_api_secret(self):
-        return NEXMO_API_SECRET
+        return getattr(settings, "SENDSMS_AUTH_TOKEN", "")
 
     def _parse_response(self, response):
         """
@@ -145,11 +148,22 @@ class SmsBackend(BaseSmsBackend):
             response_dict[key] = value
         return response_dict
 
+    def is_retryable_response(self, response):
+        if super(SmsBackend, self).is_retryable_response(response):
+            return True
+        if response.status_code != 200:
+            return False
+        try:
+            status_code = int(response.json().get("messages")[0].get("status"))
+        except (JSONDecodeError, AttributeError, IndexError, TypeError, ValueError):
+            return False
+        return status_code in NEXMO_RETRYABLE_STATUS_CODES
+
     def parse(self, host, response):
         if not response.status_code == 200:
             if self.fail_silently:
                 logger.warning("Error: %s %r", response.status_code, response.content)
-                return False
+                return False, response
             raise Error("Error: %s %r", response.status_code, response.content)
 
         status_code = int(response.json().get("messages")[0].get("status"))
@@ -161,7 +175,7 @@ class SmsBackend(BaseSmsBackend):
 
         if self.fail_silently:
             logger.warning("Error: %s %r", response.status_code, response.content)
-            return False, requests
+            return False, response
 
         raise ClientError(
             "Error Code {status_code}: {text}:  {meaning}".format(
@@ -169,6 +183,15 @@ class SmsBackend(BaseSmsBackend):
             )
         )
 
+    def _get_params(self, message):
+        return {
+            "from": message.from_phone,
+            "to": ",".join(message.to),
+            "text": message.body,
+            "api_key": self.get_api_key(),
+            "api_secret": self.get_api_secret(),
+        }
+
     def _send(self, message):
         """
         A helper method that does the actual sending
@@ -178,19 +201,34 @@ class SmsBackend(BaseSmsBackend):
         :rtype: bool
         """
 
-        params = {
-            "from": message.from_phone,
-            "to": ",".join(message.to),
-            "text": message.body,
-            "api_key": self.get_api_key(),
-            "api_secret": self.get_api_secret(),
-        }
+        params = self._get_params(message)
 
-        print(params)
+        logger.debug("POST to %r with body: %r", NEXMO_API_URL, params)
+
+        return self.parse(
+            NEXMO_API_URL, self.request("POST", NEXMO_API_URL, data=params)
+        )
+
+    async def _asend(self, message):
+        """
+        Asynchronous version of _send()
+        """
+
+        params = self._get_params(message)
 
         logger.debug("POST to %r with body: %r", NEXMO_API_URL, params)
 
-        return self.parse(NEXMO_API_URL, requests.post(NEXMO_API_URL, data=params))
+        return self.parse(
+            NEXMO_API_URL, await self.arequest("POST", NEXMO_API_URL, data=params)
+        )
+
+    def _send_one(self, message):
+        sent, response = self._send(message)
+        return sent
+
+    async def _asend_one(self, message):
+        sent, response = await self._asend(message)
+        return sent
 
     def send_messages(self, messages):
         """
@@ -200,10 +238,28 @@ class SmsBackend(BaseSmsBackend):
         :returns: number of messages sended successful.
         :rtype: int
         """
-        counter = 0
-        for message in messages:
-            res, _ = self._send(message)
-            if res:
-                counter += 1
+        new_conn_created = self.open()
+        try:
+            outcomes = self._send_planned(self._send_one, messages)
+        finally:
+            if new_conn_created:
+                self.close()
+
+        return outcomes.count(True)
+
+    async def asend_messages(self, messages):
+        """
+        Asynchronously send messages.
 
-        return counter
+        :param list messages: List of SmsMessage instances.
+        :returns: number of messages sended successful.
+        :rtype: int
+        """
+        new_conn_created = await self.aopen()
+        try:
+            outcomes = await self._asend_planned(self._asend_one, messages)
+        finally:
+            if new_conn_created:
+                await self.aclose()
+
+        return outcomes.count(True)
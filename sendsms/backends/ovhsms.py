@@ -7,17 +7,20 @@ import logging
 
 from django.conf import settings
 
-import requests
-
-from sendsms.backends.base import BaseSmsBackend
+from sendsms import phone
+from sendsms.backends.base import HttpSmsBackend
+from sendsms.encoding import GSM7, detect_encoding
 
 logger = logging.getLogger(__name__)
 
 
-class OvhSmsBackend(BaseSmsBackend):
-    @staticmethod
-    def _call_url(url):
-        res = requests.get(url)
+class OvhSmsBackend(HttpSmsBackend):
+    # one SMS per recipient
+    max_recipients = 1
+    phone_format = phone.INTERNATIONAL
+
+    def _call_url(self, url):
+        res = self.request("GET", url)
         res.raise_for_status()
         data = json.loads(res.text)
         if data.get("status") == 100:
@@ -28,9 +31,8 @@ class OvhSmsBackend(BaseSmsBackend):
             )
         return data
 
-    @classmethod
     def _send_via_ovh(
-        cls,
+        self,
         message,
         to_phone,  # must be "00336xxxx"-like international format
         from_phone=None,
@@ -48,7 +50,6 @@ class OvhSmsBackend(BaseSmsBackend):
         OVH_API_PASSWORD = getattr(settings, "OVH_API_PASSWORD", "")
         OVH_API_FROM = getattr(settings, "OVH_API_FROM", "")
         OVH_API_NO_STOP = getattr(settings, "OVH_API_NO_STOP", True)
-        OVH_API_SMS_CODING = 2  # UTF8-encoded characters, but max 70 characters per SMS
 
         # for some reason OVH wants "%0d" (CR character) for newlines
         message = message.replace("\r\n", "\r")
@@ -60,7 +61,9 @@ class OvhSmsBackend(BaseSmsBackend):
             "password": OVH_API_PASSWORD,
             "from": from_phone or OVH_API_FROM,
             "class": ("0" if flashing else "1"),  # flash SMS appears directly on screen
-            "smsCoding": OVH_API_SMS_CODING,
+            # 1: 7bit GSM alphabet (160 characters per SMS),
+            # 2: UTF8-encoded characters, but max 70 characters per SMS
+            "smsCoding": 1 if detect_encoding(message) == GSM7 else 2,
             "contentType": "text/json",
             "noStop": ("1" if OVH_API_NO_STOP else "0"),  # we don't send commercial SMS
             "message": message,
@@ -75,24 +78,27 @@ class OvhSmsBackend(BaseSmsBackend):
         query_string = urlencode(sorted(params.items()))
         full_url = "{}?{}".format(OVH_API_URL, query_string)
 
-        return cls._call_url(full_url)
+        return self._call_url(full_url)
+
+    def _send_to_recipient(self, message):
+        try:
+            return self._send_via_ovh(
+                message=message.body,
+                to_phone=message.to[0],
+                from_phone=message.from_phone,
+                flashing=message.flash,
+            )
+        except RuntimeError:
+            logger.error("OVH SMS sending failed", exc_info=True)
+            if not self.fail_silently:
+                raise
 
     def send_messages(self, messages):
-        results = []
-        for message in messages:
-            for (
-                to_phone
-            ) in message.to:  # For now we separate recipients in different SMS
-                try:
-                    res = self._send_via_ovh(
-                        message=message.body,
-                        to_phone=to_phone,
-                        from_phone=message.from_phone,
-                        flashing=message.flash,
-                    )
-                    results.append(res)
-                except RuntimeError:
-                    logger.error("OVH SMS sending failed", exc_info=True)
-                    if not self.fail_silently:
-                        raise
-        return results
+        requests = [request for request, entries in self.plan(messages)]
+        new_conn_created = self.open()
+        try:
+            results = self._dispatch(self._send_to_recipient, requests)
+        finally:
+            if new_conn_created:
+                self.close()
+        return [res for res in results if res is not None]
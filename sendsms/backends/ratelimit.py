@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""rate limiting backend
+
+This backend wraps another backend and shapes the outgoing traffic so it
+stays under the provider's messages-per-second limit, instead of bursting
+and having messages rejected (e.g. nexmo error 1, "Throttled").
+
+Every recipient counts as one message. Messages are handed to the wrapped
+backend one at a time, over a single connection, as soon as the limiter
+allows it. Messages with more recipients than the per-second limit are sent
+in parts of at most that many recipients.
+
+By default the limit is enforced per process with a token bucket. Set
+``SENDSMS_RATE_LIMIT_CACHE`` to a cache alias to share the limit between
+all processes using that cache.
+
+Usage
+-----
+
+In settings.py
+
+    SENDSMS_BACKEND = 'sendsms.backends.ratelimit.SmsBackend'
+    RATELIMIT_SENDSMS_BACKEND = 'actual.backend.to.use.SmsBackend'
+    SENDSMS_RATE_LIMITS = {
+        'actual.backend.to.use.SmsBackend': 30,  # messages per second
+    }
+    SENDSMS_RATE_LIMIT_CACHE = 'default'  # optional
+
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from sendsms.api import count_sent, get_connection
+from sendsms.backends.base import BaseSmsBackend
+from sendsms.message import SmsMessage
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+class TokenBucket(object):
+    """
+    In-process token bucket.
+
+    Tokens are refilled continuously at ``rate`` per second up to
+    ``capacity``. acquire() reserves tokens and sleeps until they are
+    available, so concurrent callers are spaced out evenly.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(capacity)
+        self.timestamp = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.timestamp) * self.rate
+            )
+            self.timestamp = now
+            self.tokens -= tokens
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+        if delay:
+            self.sleep(delay)
+
+
+class CacheTokenBucket(object):
+    """
+    Rate limiter shared between processes through Django's cache framework.
+
+    Tokens are counted per second with an atomic ``incr``. A sliding window
+    weighs the previous second's count by the part of it still inside the
+    last second, so no second ever sees more than ``rate`` tokens, also
+    across window boundaries. Callers over the limit give their tokens back
+    and sleep until they fit, requests larger than ``rate`` are taken in
+    slices of ``rate`` tokens.
+    """
+
+    def __init__(self, key, rate, cache, clock=time.time, sleep=time.sleep):
+        self.key = key
+        self.rate = rate
+        self.cache = cache
+        self.clock = clock
+        self.sleep = sleep
+
+    def acquire(self, tokens=1):
+        while tokens > self.rate:
+            self._acquire(self.rate)
+            tokens -= self.rate
+        self._acquire(tokens)
+
+    def _acquire(self, tokens):
+        while True:
+            now = self.clock()
+            window = int(now)
+            key = "%s:%d" % (self.key, window)
+            self.cache.add(key, 0, timeout=3)
+            try:
+                used = self.cache.incr(key, tokens)
+            except ValueError:
+                # the key expired in between
+                continue
+            previous = self.cache.get("%s:%d" % (self.key, window - 1), 0)
+            remaining = 1 - (now - window)
+            if used + previous * remaining <= self.rate:
+                return
+            self.cache.decr(key, tokens)
+            free = self.rate - used
+            if previous and free >= 0:
+                # wait until enough of the previous second has slid out
+                self.sleep(max(remaining - free / float(previous), 0.001))
+            else:
+                self.sleep(remaining)
+
+
+def get_bucket(path, rate):
+    """
+    Return the limiter for the backend ``path``, shared within the process.
+    """
+    cache_alias = getattr(settings, "SENDSMS_RATE_LIMIT_CACHE", None)
+    if cache_alias:
+        from django.core.cache import caches
+
+        return CacheTokenBucket(
+            "sendsms:ratelimit:%s" % path, rate, caches[cache_alias]
+        )
+
+    with _buckets_lock:
+        bucket = _buckets.get(path)
+        if bucket is None or bucket.rate != rate:
+            bucket = _buckets[path] = TokenBucket(rate)
+        return bucket
+
+
+class SmsBackend(BaseSmsBackend):
+    def __init__(self, fail_silently=False, **kwargs):
+        super(SmsBackend, self).__init__(fail_silently=fail_silently, **kwargs)
+        path = getattr(settings, "RATELIMIT_SENDSMS_BACKEND", None)
+        if not path:
+            raise ImproperlyConfigured("Set RATELIMIT_SENDSMS_BACKEND")
+        rate = getattr(settings, "SENDSMS_RATE_LIMITS", {}).get(path)
+        self.bucket = get_bucket(path, rate) if rate else None
+        self.connection = get_connection(path, fail_silently=fail_silently)
+
+    def open(self):
+        return self.connection.open()
+
+    def close(self):
+        self.connection.close()
+
+    def send_messages(self, messages):
+        if self.bucket is None:
+            return self.connection.send_messages(messages)
+
+        sent = 0
+        new_conn_created = self.open()
+        try:
+            for message in messages:
+                sent += self._send_message(message)
+        finally:
+            if new_conn_created:
+                self.close()
+        return sent
+
+    def _split(self, message):
+        size = max(1, int(self.bucket.rate))
+        if len(message.to) <= size:
+            return [message]
+        return [
+            SmsMessage(
+                body=message.body,
+                from_phone=message.from_phone,
+                to=message.to[i : i + size],
+                flash=message.flash,
+                idempotency_key=message.idempotency_key
+                and "%s:%d" % (message.idempotency_key, i),
+            )
+            for i in range(0, len(message.to), size)
+        ]
+
+    def _send_message(self, message):
+        parts = self._split(message)
+        sent = 0
+        for part in parts:
+            self.bucket.acquire(max(1, len(part.to)))
+            sent += count_sent(self.connection.send_messages([part]), [part])
+        if parts[0] is not message:
+            ids = [i for part in parts for i in part.provider_ids or ()]
+            message.provider_ids = ids or None
+        return int(sent == len(parts))
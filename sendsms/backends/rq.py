@@ -5,6 +5,13 @@ This backend will send your messages asynchronously with python-rq.
 Before using this backend, make sure that django-rq is installed and
 configured.
 
+Messages are queued in their compact :py:meth:`SmsMessage.to_dict` form, one
+job per ``RQ_SENDSMS_CHUNK_SIZE`` messages. Each worker process keeps one
+open connection to ``RQ_SENDSMS_BACKEND`` across jobs. The default rq
+``Worker`` forks a new work horse process for every job, so the connection
+is only reused by a non-forking worker such as ``SimpleWorker``
+(``python manage.py rqworker --worker-class rq.SimpleWorker``).
+
 Usage
 -----
 
@@ -13,29 +20,68 @@ In settings.py
 
     SENDSMS_BACKEND = 'sendsms.backends.rq.SmsBackend'
     RQ_SENDSMS_BACKEND = 'actual.backend.to.use.SmsBackend'
+    RQ_SENDSMS_QUEUE = 'sms'  # defaults to 'default'
+    RQ_SENDSMS_CHUNK_SIZE = 100  # default
+    RQ_SENDSMS_JOB_TIMEOUT = 300  # defaults to the queue's timeout
 
 
 """
+
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 
-from django_rq import job
-
-from sendsms.api import get_connection
+from sendsms.api import count_sent, get_worker_connection
 from sendsms.backends.base import BaseSmsBackend
+from sendsms.message import SmsMessage
 
-RQ_SENDSMS_BACKEND = getattr(settings, "RQ_SENDSMS_BACKEND", None)
 
-if not RQ_SENDSMS_BACKEND:
-    raise ImproperlyConfigured("Set RQ_SENDSMS_BACKEND")
+def get_backend_path():
+    path = getattr(settings, "RQ_SENDSMS_BACKEND", None)
+    if not path:
+        raise ImproperlyConfigured("Set RQ_SENDSMS_BACKEND")
+    return path
 
 
-@job
 def send_messages(messages):
-    connection = get_connection(RQ_SENDSMS_BACKEND)
-    connection.send_messages(messages)
+    # SmsMessage instances are accepted for jobs queued by older versions
+    messages = [
+        m if isinstance(m, SmsMessage) else SmsMessage.from_dict(m) for m in messages
+    ]
+    connection = get_worker_connection(get_backend_path())
+    return count_sent(connection.send_messages(messages), messages)
 
 
 class SmsBackend(BaseSmsBackend):
+    def __init__(
+        self,
+        fail_silently=False,
+        queue=None,
+        chunk_size=None,
+        job_timeout=None,
+        **kwargs
+    ):
+        super(SmsBackend, self).__init__(fail_silently=fail_silently, **kwargs)
+        get_backend_path()
+        self.queue = queue or getattr(settings, "RQ_SENDSMS_QUEUE", "default")
+        self.chunk_size = chunk_size or getattr(settings, "RQ_SENDSMS_CHUNK_SIZE", 100)
+        self.job_timeout = job_timeout or getattr(
+            settings, "RQ_SENDSMS_JOB_TIMEOUT", None
+        )
+
     def send_messages(self, messages):
-        send_messages.delay(messages)
+        """
+        Queue the messages.
+
+        :returns: the number of messages queued.
+        """
+        import django_rq
+
+        queue = django_rq.get_queue(self.queue)
+        payload = [message.to_dict() for message in messages]
+        for i in range(0, len(payload), self.chunk_size):
+            queue.enqueue(
+                send_messages,
+                payload[i : i + self.chunk_size],
+                job_timeout=self.job_timeout,
+            )
+        return len(payload)
@@ -1,56 +1,84 @@
 """SMS Global sms backend class."""
 import logging
-import math
 import re
-import urllib
 
 from django.conf import settings
 
-import urllib2
-
-from .base import BaseSmsBackend
+from .base import HttpSmsBackend
 
 logger = logging.getLogger(__name__)
 
-SMSGLOBAL_USERNAME = getattr(settings, "SMSGLOBAL_USERNAME", "")
-SMSGLOBAL_PASSWORD = getattr(settings, "SMSGLOBAL_PASSWORD", "")
-SMSGLOBAL_CHECK_BALANCE_COUNTRY = getattr(
-    settings, "SMSGLOBAL_CHECK_BALANCE_COUNTRY", False
-)
 SMSGLOBAL_API_URL_SENDSMS = "https://www.smsglobal.com.au/http-api.php"
 SMSGLOBAL_API_URL_CHECKBALANCE = "https://www.smsglobal.com/credit-api.php"
 
+# "OK: 0; Sent queued message ID: 2063619577732703 SMSGlobalMsgID:6171799108850954"
+RESPONSE_RE = re.compile(
+    r"^.+?:\s*(.+?)\s*;\s*Sent queued message ID:\s*(.+?)\s*SMSGlobalMsgID:(.+?)$",
+    re.IGNORECASE,
+)
+
 
-class SmsBackend(BaseSmsBackend):
+class SmsBackend(HttpSmsBackend):
     """
     A wrapper that manages the SMS Global network connection.
 
     Sending and parsing functionality borrowed from http://namingcrisis.net/code
+
+    The balance is cached in Django's default cache for
+    SMSGLOBAL_BALANCE_CACHE_TIMEOUT seconds (60 by default, 0 disables it).
     """
 
+    # recipients are posted comma separated in a single form field, keep
+    # requests small (raise it with SENDSMS_MAX_RECIPIENTS)
+    max_recipients = 100
+
     def get_username(self):
-        return SMSGLOBAL_USERNAME
+        return getattr(settings, "SMSGLOBAL_USERNAME", "")
 
     def get_password(self):
-        return SMSGLOBAL_PASSWORD
+        return getattr(settings, "SMSGLOBAL_PASSWORD", "")
 
-    def get_balance(self):
+    def get_balance_country(self):
+        return getattr(settings, "SMSGLOBAL_CHECK_BALANCE_COUNTRY", False)
+
+    def get_balance(self, refresh=False):
         """
         Get balance with provider.
+
+        :param bool refresh: ignore the cached balance.
         """
-        if not SMSGLOBAL_CHECK_BALANCE_COUNTRY:
+        country = self.get_balance_country()
+        if not country:
             raise Exception(
                 "SMSGLOBAL_CHECK_BALANCE_COUNTRY setting must be set to check balance."
             )
 
+        from django.core.cache import cache
+
+        key = "sendsms:smsglobal:balance:%s:%s" % (self.get_username(), country)
+        balance = None if refresh else cache.get(key)
+        if balance is None:
+            balance = self._fetch_balance(country)
+            timeout = getattr(settings, "SMSGLOBAL_BALANCE_CACHE_TIMEOUT", 60)
+            if timeout:
+                cache.set(key, balance, timeout)
+        return balance
+
+    def _fetch_balance(self, country):
         params = {
             "user": self.get_username(),
             "password": self.get_password(),
-            "country": SMSGLOBAL_CHECK_BALANCE_COUNTRY,
+            "country": country,
         }
 
-        req = urllib2.Request(SMSGLOBAL_API_URL_CHECKBALANCE, urllib.urlencode(params))
-        response = urllib2.urlopen(req).read()
+        new_conn_created = self.open()
+        try:
+            response = self.request(
+                "POST", SMSGLOBAL_API_URL_CHECKBALANCE, data=params
+            ).text
+        finally:
+            if new_conn_created:
+                self.close()
 
         # CREDITS:8658.44;COUNTRY:AU;SMS:3764.54;
         if response.startswith("ERROR"):
@@ -74,11 +102,14 @@ class SmsBackend(BaseSmsBackend):
         if not sms_messages:
             return
 
-        num_sent = 0
-        for message in sms_messages:
-            if self._send(message):
-                num_sent += 1
-        return num_sent
+        new_conn_created = self.open()
+        try:
+            outcomes = self._send_planned(self._send, sms_messages)
+        finally:
+            if new_conn_created:
+                self.close()
+
+        return outcomes.count(True)
 
     def _send(self, message):
         """A helper method that does the actual sending."""
@@ -92,11 +123,10 @@ class SmsBackend(BaseSmsBackend):
             "text": message.body,
             "clientcharset": charset,
             "detectcharset": 1,
-            "maxsplit": int(math.ceil(len(message.body) / 160)),
+            "maxsplit": message.segment_count,
         }
 
-        req = urllib2.Request(SMSGLOBAL_API_URL_SENDSMS, urllib.urlencode(params))
-        result_page = urllib2.urlopen(req).read()
+        result_page = self.request("POST", SMSGLOBAL_API_URL_SENDSMS, data=params).text
         results = self._parse_response(result_page)
 
         if results is None:
@@ -135,15 +165,10 @@ class SmsBackend(BaseSmsBackend):
         safe to assume that it was either a failed result or worse, the interface
         contract has changed.
         """
-        # Sample result_page, single line -> "OK: 0; Sent queued message ID: 2063619577732703 SMSGlobalMsgID:6171799108850954"
         resultline = result_page.splitlines()[0]  # get result line
         if resultline.startswith("ERROR:"):
             raise Exception(resultline.replace("ERROR: ", ""))
-        patt = re.compile(
-            r"^.+?:\s*(.+?)\s*;\s*Sent queued message ID:\s*(.+?)\s*SMSGlobalMsgID:(.+?)$",
-            re.IGNORECASE,
-        )
-        m = patt.match(resultline)
+        m = RESPONSE_RE.match(resultline)
         if m:
             return (m.group(1), m.group(2), m.group(3))
         return None
@@ -27,9 +27,7 @@ Usage::
 
 from django.conf import settings
 
-import requests
-
-from .base import BaseSmsBackend
+from .base import HttpSmsBackend
 
 SMSPUBLI_API_URL = "https://secure.gateway360.com/api/push/"
 SMSPUBLI_API_VERSION = "HTTPV3"
@@ -37,12 +35,8 @@ SMSPUBLI_DC = "SMS"
 SMSPUBLI_DR = 0
 SMSPUBLI_ROUTE = 2
 
-SMSPUBLI_USERNAME = getattr(settings, "SMSPUBLI_USERNAME", "")
-SMSPUBLI_PASSWORD = getattr(settings, "SMSPUBLI_PASSWORD", "")
-SMSPUBLI_ALLOW_LONG_SMS = getattr(settings, "SMSPUBLI_ALLOW_LONG_SMS", False)
-
 
-class SmsBackend(BaseSmsBackend):
+class SmsBackend(HttpSmsBackend):
     """
     SMS Backend smspubli.com provider.
 
@@ -51,11 +45,15 @@ class SmsBackend(BaseSmsBackend):
     class overrides the method "get_xxxx" to return data stored in the database.
     """
 
+    # recipients are posted comma separated in a single form field, keep
+    # requests small (raise it with SENDSMS_MAX_RECIPIENTS)
+    max_recipients = 100
+
     def get_username(self):
-        return SMSPUBLI_USERNAME
+        return getattr(settings, "SMSPUBLI_USERNAME", "")
 
     def get_password(self):
-        return SMSPUBLI_PASSWORD
+        return getattr(settings, "SMSPUBLI_PASSWORD", "")
 
     def _send(self, message):
         """
@@ -68,8 +66,8 @@ class SmsBackend(BaseSmsBackend):
 
         params = {
             "V": SMSPUBLI_API_VERSION,
-            "UN": SMSPUBLI_USERNAME,
-            "PWD": SMSPUBLI_PASSWORD,
+            "UN": self.get_username(),
+            "PWD": self.get_password(),
             "R": SMSPUBLI_ROUTE,
             "SA": message.from_phone,
             "DA": ",".join(message.to),
@@ -78,10 +76,10 @@ class SmsBackend(BaseSmsBackend):
             "DR": SMSPUBLI_DR,
             "UR": message.from_phone,
         }
-        if SMSPUBLI_ALLOW_LONG_SMS:
+        if getattr(settings, "SMSPUBLI_ALLOW_LONG_SMS", False):
             params["LM"] = "1"
 
-        response = requests.post(SMSPUBLI_API_URL, params)
+        response = self.request("POST", SMSPUBLI_API_URL, data=params)
         if response.status_code != 200:
             if not self.fail_silently:
                 raise
@@ -122,10 +120,11 @@ class SmsBackend(BaseSmsBackend):
         :rtype: int
         """
 
-        counter = 0
-        for message in messages:
-            res = self._send(message)
-            if res:
-                counter += 1
+        new_conn_created = self.open()
+        try:
+            outcomes = self._send_planned(self._send, messages)
+        finally:
+            if new_conn_created:
+                self.close()
 
-        return counter
+        return outcomes.count(True)
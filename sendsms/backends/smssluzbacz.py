@@ -26,14 +26,14 @@
 #    USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import logging
+import socket
 import sys
 import unicodedata
 
 from django.conf import settings
 
-from smssluzbacz_api.lite import SmsGateApi
-
-from sendsms.backends.base import BaseSmsBackend
+from sendsms.backends.base import BaseSmsBackend, split_timeout
+from sendsms.exceptions import SmsTimeout
 
 log = logging.getLogger(__name__)
 
@@ -48,6 +48,7 @@ class SmsBackend(BaseSmsBackend):
       SMS_SLUZBA_API_LOGIN - sms.sluzba.cz login
       SMS_SLUZBA_API_PASSWORD - sms.sluzba.cz password
       SMS_SLUZBA_API_TIMEOUT - connection timeout to sms.sluzba.cz in seconds
+        (defaults to the read timeout of SENDSMS_TIMEOUT)
       SMS_SLUZBA_API_USE_SSL - whether to use ssl via http or not
       SMS_SLUZBA_API_USE_POST - whether to use GET or POST http method
 
@@ -55,19 +56,25 @@ class SmsBackend(BaseSmsBackend):
 
     def __init__(self, fail_silently=False, **kwargs):
         super(SmsBackend, self).__init__(fail_silently=fail_silently, **kwargs)
-        self.open()
+        self.client = None
 
     def __del__(self):
         self.close()
 
     def open(self):
         """Initializes sms.sluzba.cz API library."""
+        if self.client is not None:
+            return False
+
+        from smssluzbacz_api.lite import SmsGateApi
+
         self.client = SmsGateApi(
             getattr(settings, "SMS_SLUZBA_API_LOGIN", ""),
             getattr(settings, "SMS_SLUZBA_API_PASSWORD", ""),
-            getattr(settings, "SMS_SLUZBA_API_TIMEOUT", 2),
+            getattr(settings, "SMS_SLUZBA_API_TIMEOUT", split_timeout(self.timeout)[1]),
             getattr(settings, "SMS_SLUZBA_API_USE_SSL", True),
         )
+        return True
 
     def close(self):
         """Cleaning up the reference for sms.sluzba.cz API library."""
@@ -86,26 +93,48 @@ class SmsBackend(BaseSmsBackend):
         :rtype: int
 
         """
-        count = 0
+        recipients = []
         for message in messages:
             message_body = unicodedata.normalize("NFKD", unicode(message.body)).encode(
                 "ascii", "ignore"
             )
-            for tel_number in message.to:
-                try:
-                    self.client.send(
-                        tel_number,
-                        message_body,
-                        getattr(settings, "SMS_SLUZBA_API_USE_POST", True),
-                    )
-                except Exception:
-                    if self.fail_silently:
-                        log.exception(
-                            "Error while sending sms via sms.sluzba.cz backend API."
-                        )
-                    else:
-                        raise
-                else:
-                    count += 1
-
-        return count
+            for tel_number in self.format_recipients(message):
+                recipients.append((tel_number, message_body))
+
+        new_conn_created = self.open()
+        try:
+            results = self._dispatch(self._send, recipients)
+        finally:
+            if new_conn_created:
+                self.close()
+
+        return len([res for res in results if res])
+
+    def is_retryable_exception(self, exception):
+        """Network errors and timeouts are transient."""
+        return isinstance(exception, OSError)
+
+    def _send(self, recipient):
+        tel_number, message_body = recipient
+        try:
+            self.retry_policy.call(
+                lambda: self.client.send(
+                    tel_number,
+                    message_body,
+                    getattr(settings, "SMS_SLUZBA_API_USE_POST", True),
+                ),
+                retry_on_exception=self.is_retryable_exception,
+            )
+        except socket.timeout as e:
+            if self.fail_silently:
+                log.exception(
+                    "Timeout while sending sms via sms.sluzba.cz backend API."
+                )
+                return False
+            raise SmsTimeout("sms.sluzba.cz did not answer in time") from e
+        except Exception:
+            if self.fail_silently:
+                log.exception("Error while sending sms via sms.sluzba.cz backend API.")
+                return False
+            raise
+        return True
@@ -5,36 +5,157 @@ this backend requires the twilio python library: http://pypi.python.org/pypi/twi
 """
 from django.conf import settings
 
-import twilio
-
 from sendsms.backends.base import BaseSmsBackend
+from sendsms.exceptions import SmsTimeout
 
-if int(twilio.__version_info__[0]) > 5:
-    TWILIO_5 = False
-    from twilio.rest import Client as TwilioRestClient
-else:
-    TWILIO_5 = True
-    from twilio.rest import TwilioRestClient
 
+def get_client_class():
+    """
+    Import the twilio library on first use.
+
+    :returns: (REST client class, True if twilio < 6)
+    """
+    import twilio
 
-TWILIO_ACCOUNT_SID = getattr(settings, "SENDSMS_TWILIO_ACCOUNT_SID", "")
-TWILIO_AUTH_TOKEN = getattr(settings, "SENDSMS_TWILIO_AUTH_TOKEN", "")
+    if int(twilio.__version_info__[0]) > 5:
+        from twilio.rest import Client
+
+        return Client, False
+
+    from twilio.rest import TwilioRestClient
+
+    return TwilioRestClient, True
 
 
 class SmsBackend(BaseSmsBackend):
+    """
+    Twilio backend.
+
+    The REST client is created once per open connection, on twilio >= 6 with
+    a pooled HTTP client. Recipients are sent concurrently with up to
+    SENDSMS_TWILIO_MAX_WORKERS threads (defaults to SENDSMS_MAX_WORKERS).
+    The SIDs of the created messages are attached to each message as
+    ``provider_ids``.
+
+    Settings::
+
+        SENDSMS_BACKEND = 'sendsms.backends.twiliorest.SmsBackend'
+        SENDSMS_TWILIO_ACCOUNT_SID = 'xxx'
+        SENDSMS_TWILIO_AUTH_TOKEN = 'xxx'
+        SENDSMS_TWILIO_MAX_WORKERS = 4
+    """
+
+    def __init__(self, fail_silently=False, max_workers=None, **kwargs):
+        max_workers = max_workers or getattr(
+            settings, "SENDSMS_TWILIO_MAX_WORKERS", None
+        )
+        super(SmsBackend, self).__init__(
+            fail_silently=fail_silently, max_workers=max_workers, **kwargs
+        )
+        self.client = None
+
+    def open(self):
+        """Create the Twilio REST client."""
+        if self.client is not None:
+            return False
+
+        client_class, self.twilio_5 = get_client_class()
+        account_sid = getattr(settings, "SENDSMS_TWILIO_ACCOUNT_SID", "")
+        auth_token = getattr(settings, "SENDSMS_TWILIO_AUTH_TOKEN", "")
+        if self.twilio_5:
+            self.client = client_class(account_sid, auth_token)
+        else:
+            from requests.adapters import HTTPAdapter
+            from twilio.http.http_client import TwilioHttpClient
+
+            http_client = TwilioHttpClient(pool_connections=True)
+            # set afterwards, the constructor only accepts a single number but
+            # the timeout is handed to requests as is
+            http_client.timeout = self.timeout
+            http_client.session.mount(
+                "https://", HTTPAdapter(pool_maxsize=max(10, self.max_workers))
+            )
+            self.client = client_class(account_sid, auth_token, http_client=http_client)
+        return True
+
+    def close(self):
+        """Release the Twilio REST client and its connections."""
+        if self.client is None:
+            return
+        try:
+            session = getattr(
+                getattr(self.client, "http_client", None), "session", None
+            )
+            if session is not None:
+                session.close()
+        finally:
+            self.client = None
+
+    def _send(self, recipient):
+        """
+        Create the message for one recipient.
+
+        :returns: the message SID, None if sending failed silently.
+        """
+        message, to = recipient
+        try:
+            if self.twilio_5:
+                created = self.client.sms.messages.create(
+                    body=message.body, to=to, from_=message.from_phone
+                )
+            else:
+                created = self.client.messages.create(
+                    to=to, from_=message.from_phone, body=message.body
+                )
+        except Exception as e:
+            if self.fail_silently:
+                return None
+            if self.is_timeout_exception(e):
+                raise SmsTimeout("Twilio did not answer in time") from e
+            raise
+        return created.sid
+
     def send_messages(self, messages):
-        client = TwilioRestClient(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        for message in messages:
-            for to in message.to:
-                try:
-                    if TWILIO_5:
-                        client.sms.messages.create(
-                            body=message.body, to=to, from_=message.from_phone
-                        )
-                    else:
-                        client.messages.create(
-                            to=to, from_=message.from_phone, body=message.body
-                        )
-                except Exception:
-                    if not self.fail_silently:
-                        raise
+        """
+        Send messages, one Twilio message per recipient.
+
+        :returns: number of Twilio messages created.
+        :rtype: int
+        """
+        recipients = [
+            (message, to)
+            for message in messages
+            for to in self.format_recipients(message)
+        ]
+        new_conn_created = self.open()
+        try:
+            sids = self._dispatch(self._send, recipients)
+        except Exception as e:
+            self._attach_sids(messages, recipients, e.dispatch_results)
+            raise
+        finally:
+            if new_conn_created:
+                self.close()
+
+        return self._attach_sids(messages, recipients, sids)
+
+    def _attach_sids(self, messages, recipients, sids):
+        """
+        Attach the SIDs to the messages and record which messages were sent.
+
+        :returns: number of Twilio messages created.
+        """
+        attempted = set(id(message) for message, to in recipients)
+        failed = set()
+        for (message, to), sid in zip(recipients, sids):
+            if sid is None:
+                failed.add(id(message))
+                continue
+            if message.provider_ids is None:
+                message.provider_ids = []
+            message.provider_ids.append(sid)
+        self._set_outcomes(
+            id(message) in attempted and id(message) not in failed
+            for message in messages
+        )
+        return len([sid for sid in sids if sid is not None])
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+Durable outbound SMS queue stored in the database.
+
+The ``sendsms.backends.dbqueue`` backend stores messages as
+:py:class:`~sendsms.dbqueue.models.OutboundSms` rows, the
+``sendsms_dispatch`` management command sends them through the real backend.
+Any number of dispatchers can run in parallel, each claims its own batches.
+
+Usage
+-----
+
+In settings.py
+
+    INSTALLED_APPS += ['sendsms.dbqueue']
+    SENDSMS_BACKEND = 'sendsms.backends.dbqueue.SmsBackend'
+    DBQUEUE_SENDSMS_BACKEND = 'actual.backend.to.use.SmsBackend'
+    SENDSMS_DBQUEUE_MAX_ATTEMPTS = 3  # default
+    SENDSMS_DBQUEUE_CLAIM_TIMEOUT = 300  # seconds before a claim is abandoned
+
+then run one or more dispatchers::
+
+    python manage.py sendsms_dispatch --loop
+
+"""
+
+import django
+
+if django.VERSION < (3, 2):
+    # DbQueueConfig.default is used from Django 3.2 on
+    default_app_config = "sendsms.dbqueue.apps.DbQueueConfig"
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+from django.apps import AppConfig
+
+
+class DbQueueConfig(AppConfig):
+    default = True
+    name = "sendsms.dbqueue"
+    label = "sendsms_dbqueue"
+    verbose_name = "SMS queue"
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Send the messages queued in the database through the real backend.
+"""
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from sendsms.api import get_connection
+from sendsms.backends.base import track_outcomes
+from sendsms.dbqueue.models import OutboundSms
+
+
+def get_backend_path():
+    path = getattr(settings, "DBQUEUE_SENDSMS_BACKEND", None)
+    if not path:
+        raise ImproperlyConfigured("Set DBQUEUE_SENDSMS_BACKEND")
+    return path
+
+
+def dispatch_batch(connection, batch_size=100):
+    """
+    Claim and send one batch of queued messages.
+
+    When the backend raises, the messages it reported as sent are marked
+    sent, the others are queued again (or marked failed once
+    ``SENDSMS_DBQUEUE_MAX_ATTEMPTS`` is reached) and the exception is
+    re-raised. Messages the backend reports as not sent are marked failed.
+
+    :returns: number of messages claimed, 0 when the queue is empty.
+    """
+    rows = OutboundSms.objects.claim(batch_size)
+    if not rows:
+        return 0
+
+    batch = [row.to_message() for row in rows]
+    with track_outcomes(connection, batch) as outcomes:
+        try:
+            connection.send_messages(batch)
+        except Exception as e:
+            _mark_sent(
+                [
+                    (row, message)
+                    for row, message, outcome in zip(rows, batch, outcomes)
+                    if outcome is True
+                ]
+            )
+            _requeue(
+                [row for row, outcome in zip(rows, outcomes) if outcome is not True], e
+            )
+            raise
+
+    sent, failed = [], []
+    for row, message, outcome in zip(rows, batch, outcomes):
+        if outcome is False:
+            row.attempts += 1
+            row.status = OutboundSms.FAILED
+            row.last_error = "Not accepted by the backend"
+            failed.append(row)
+        else:
+            sent.append((row, message))
+    _mark_sent(sent)
+    OutboundSms.objects.bulk_update(failed, ["status", "attempts", "last_error"])
+    return len(rows)
+
+
+def _mark_sent(sent):
+    now = timezone.now()
+    for row, message in sent:
+        row.attempts += 1
+        row.status = OutboundSms.SENT
+        row.sent_at = now
+        row.provider_ids = ",".join(message.provider_ids or ())
+    OutboundSms.objects.bulk_update(
+        [row for row, message in sent],
+        ["status", "attempts", "sent_at", "provider_ids"],
+    )
+
+
+def _requeue(rows, exception):
+    max_attempts = getattr(settings, "SENDSMS_DBQUEUE_MAX_ATTEMPTS", 3)
+    for row in rows:
+        row.attempts += 1
+        row.status = (
+            OutboundSms.FAILED if row.attempts >= max_attempts else OutboundSms.QUEUED
+        )
+        row.last_error = repr(exception)
+        row.claimed_by = ""
+    OutboundSms.objects.bulk_update(
+        rows, ["status", "attempts", "last_error", "claimed_by"]
+    )
+
+
+def dispatch(batch_size=100, max_batches=None):
+    """
+    Send queued messages in batches of ``batch_size`` until the queue is
+    empty or ``max_batches`` batches were sent, over a single connection.
+    Stops at the first batch the backend raises for.
+
+    :returns: number of messages processed.
+    """
+    connection = get_connection(get_backend_path())
+    processed = batches = 0
+    new_conn_created = connection.open()
+    try:
+        while max_batches is None or batches < max_batches:
+            claimed = dispatch_batch(connection, batch_size)
+            if not claimed:
+                break
+            processed += claimed
+            batches += 1
+    finally:
+        if new_conn_created:
+            connection.close()
+    return processed
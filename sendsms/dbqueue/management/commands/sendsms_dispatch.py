@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sendsms.dbqueue.dispatcher import dispatch
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Send the SMS queued in the database through DBQUEUE_SENDSMS_BACKEND."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of messages claimed and sent at once (default: 100).",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling for new messages instead of exiting when empty.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when the queue is empty, with --loop.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                processed = dispatch(batch_size=options["batch_size"])
+            except Exception as e:
+                if not options["loop"]:
+                    raise CommandError("Sending failed: %r" % e)
+                logger.exception("Sending queued SMS failed")
+                processed = 0
+            if processed:
+                self.stdout.write("Processed %d messages" % processed)
+            if not options["loop"]:
+                break
+            if not processed:
+                time.sleep(options["interval"])
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboundSms",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("body", models.TextField()),
+                ("from_phone", models.CharField(blank=True, max_length=32)),
+                ("to", models.TextField()),
+                ("flash", models.BooleanField(default=False)),
+                (
+                    "status",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (0, "queued"),
+                            (1, "sending"),
+                            (2, "sent"),
+                            (3, "failed"),
+                        ],
+                        default=0,
+                    ),
+                ),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("claimed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "claimed_by",
+                    models.CharField(blank=True, db_index=True, max_length=32),
+                ),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                ("provider_ids", models.TextField(blank=True)),
+                ("last_error", models.TextField(blank=True)),
+            ],
+            options={
+                "verbose_name": "outbound SMS",
+                "verbose_name_plural": "outbound SMS",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "id"], name="sendsms_dbq_status_6ab9a8_idx"
+                    )
+                ],
+            },
+        ),
+    ]
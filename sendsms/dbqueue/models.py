@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from sendsms.message import SmsMessage
+
+
+class OutboundSmsQuerySet(models.QuerySet):
+    def claim(self, batch_size):
+        """
+        Claim up to ``batch_size`` queued messages for sending.
+
+        Rows are locked with ``SELECT ... FOR UPDATE SKIP LOCKED`` where the
+        database supports it, so parallel dispatchers get disjoint batches.
+        Messages claimed longer than ``SENDSMS_DBQUEUE_CLAIM_TIMEOUT`` ago
+        (by a dispatcher which died) are claimed again.
+
+        :returns: list of the claimed rows, oldest first.
+        """
+        now = timezone.now()
+        expired = now - timedelta(
+            seconds=getattr(settings, "SENDSMS_DBQUEUE_CLAIM_TIMEOUT", 300)
+        )
+        claimable = Q(status=OutboundSms.QUEUED) | Q(
+            status=OutboundSms.SENDING, claimed_at__lt=expired
+        )
+        token = uuid.uuid4().hex
+        with transaction.atomic(using=self.db):
+            ids = list(
+                self.filter(claimable)
+                .order_by("pk")
+                .select_for_update(skip_locked=True)
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                return []
+            # the status condition is repeated for databases without row locks
+            self.filter(claimable, pk__in=ids).update(
+                status=OutboundSms.SENDING, claimed_at=now, claimed_by=token
+            )
+        return list(self.filter(claimed_by=token).order_by("pk"))
+
+
+class OutboundSms(models.Model):
+    QUEUED = 0
+    SENDING = 1
+    SENT = 2
+    FAILED = 3
+    STATUS_CHOICES = (
+        (QUEUED, "queued"),
+        (SENDING, "sending"),
+        (SENT, "sent"),
+        (FAILED, "failed"),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    body = models.TextField()
+    from_phone = models.CharField(max_length=32, blank=True)
+    # comma separated
+    to = models.TextField()
+    flash = models.BooleanField(default=False)
+    status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    claimed_by = models.CharField(max_length=32, blank=True, db_index=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    provider_ids = models.TextField(blank=True)
+    last_error = models.TextField(blank=True)
+
+    objects = OutboundSmsQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "outbound SMS"
+        verbose_name_plural = "outbound SMS"
+        indexes = [models.Index(fields=["status", "id"])]
+
+    def __str__(self):
+        return "%s: %s" % (self.to, self.get_status_display())
+
+    @classmethod
+    def from_message(cls, message):
+        return cls(
+            body=message.body,
+            from_phone=message.from_phone or "",
+            to=",".join(message.to),
+            flash=message.flash,
+        )
+
+    def to_message(self):
+        return SmsMessage(
+            body=self.body,
+            from_phone=self.from_phone or None,
+            to=self.to.split(",") if self.to else [],
+            flash=self.flash,
+        )
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+SMS encoding detection and segment calculation.
+
+A body which only uses characters of the GSM 03.38 alphabet is sent as
+GSM-7 (160 septets, or 153 per part of a concatenated SMS). Anything else
+has to be sent as UCS-2 (70 UTF-16 code units, or 67 per part). Characters
+of the GSM extension table take two septets, characters outside the Basic
+Multilingual Plane take two UCS-2 code units; neither may be split across
+parts.
+"""
+
+GSM7 = "GSM-7"
+UCS2 = "UCS-2"
+
+GSM7_BASIC = frozenset(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM7_EXTENDED = frozenset("\f^{}\\[~]|€")
+GSM7_CHARSET = GSM7_BASIC | GSM7_EXTENDED
+
+#: (single SMS, part of a concatenated SMS) capacity, the difference is the
+#: room taken by the user data header.
+SEGMENT_LENGTHS = {GSM7: (160, 153), UCS2: (70, 67)}
+
+
+def detect_encoding(body):
+    """
+    Return :py:data:`GSM7` if ``body`` can be encoded in the GSM 03.38
+    alphabet, :py:data:`UCS2` otherwise.
+    """
+    if GSM7_CHARSET.issuperset(body):
+        return GSM7
+    return UCS2
+
+
+def _char_width(encoding):
+    if encoding == GSM7:
+        return lambda char: 2 if char in GSM7_EXTENDED else 1
+    return lambda char: 2 if char > "\uffff" else 1
+
+
+def encoded_length(body, encoding=None):
+    """
+    Return the length of ``body`` in septets (GSM-7) or code units (UCS-2).
+    """
+    encoding = encoding or detect_encoding(body)
+    if encoding == GSM7:
+        return len(body) + sum(body.count(char) for char in GSM7_EXTENDED)
+    return len(body.encode("utf-16-le")) // 2
+
+
+def split_segments(body, encoding=None):
+    """
+    Split ``body`` into the parts it is sent as.
+
+    :returns: list of strings, a single item if the body fits into one SMS.
+    """
+    encoding = encoding or detect_encoding(body)
+    single, multi = SEGMENT_LENGTHS[encoding]
+    length = encoded_length(body, encoding)
+    if length <= single:
+        return [body]
+    if length == len(body):
+        # Only single width characters, plain slicing is exact.
+        return [body[i : i + multi] for i in range(0, len(body), multi)]
+
+    width = _char_width(encoding)
+    segments = []
+    start = used = 0
+    for index, char in enumerate(body):
+        char_width = width(char)
+        if used + char_width > multi:
+            segments.append(body[start:index])
+            start, used = index, 0
+        used += char_width
+    segments.append(body[start:])
+    return segments
+
+
+def segment_count(body, encoding=None):
+    """
+    Return the number of SMS ``body`` is sent as.
+    """
+    encoding = encoding or detect_encoding(body)
+    single, multi = SEGMENT_LENGTHS[encoding]
+    length = encoded_length(body, encoding)
+    if length <= single:
+        return 1
+    if length == len(body):
+        return -(-length // multi)
+    return len(split_segments(body, encoding))
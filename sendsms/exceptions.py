@@ -5,3 +5,21 @@ class InvalidPhoneNumber(Exception):
     """
 
     pass
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised by the circuit breaker backend instead of calling a backend which
+    is currently considered down.
+    """
+
+    pass
+
+
+class SmsTimeout(TimeoutError):
+    """
+    Raised by the backends when the provider did not answer within the
+    configured timeout.
+    """
+
+    pass
@@ -1,31 +1,116 @@
 # -*- coding: utf-8 -*-
+from functools import lru_cache
+
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 
+from sendsms import encoding
 from sendsms.api import get_connection
 from sendsms.signals import sms_post_send
 
 
+@lru_cache(maxsize=None)
+def get_default_from_phone():
+    return getattr(settings, "SENDSMS_DEFAULT_FROM_PHONE", "")
+
+
+@receiver(setting_changed)
+def clear_default_from_phone(setting, **kwargs):
+    if setting == "SENDSMS_DEFAULT_FROM_PHONE":
+        get_default_from_phone.cache_clear()
+
+
 class SmsMessage(object):
     """
     A sms message
+
+    Recipients passed as a tuple are kept as is, any other iterable is copied
+    into a list.
+
+    Backends which get message ids back from the provider store them in
+    ``provider_ids``.
+
+    ``idempotency_key`` optionally identifies the message for the
+    deduplication backend, messages with the same key are only sent once.
     """
 
-    def __init__(self, body, from_phone=None, to=None, flash=False, connection=None):
+    __slots__ = (
+        "to",
+        "from_phone",
+        "body",
+        "flash",
+        "connection",
+        "provider_ids",
+        "idempotency_key",
+    )
+
+    def __init__(
+        self,
+        body,
+        from_phone=None,
+        to=None,
+        flash=False,
+        connection=None,
+        idempotency_key=None,
+    ):
         """
         Initialize a single SMS message (which can be sent to multiple recipients)
         """
-        if to:
+        if isinstance(to, tuple):
+            self.to = to
+        elif to:
             # assert not isinstance(to, basetring), '"to" argument must be a list or tuple'
             self.to = list(to)
         else:
             self.to = []
 
-        self.from_phone = from_phone or getattr(
-            settings, "SENDSMS_DEFAULT_FROM_PHONE", ""
-        )
+        self.from_phone = from_phone or get_default_from_phone()
         self.body = body
         self.flash = flash
         self.connection = connection
+        self.provider_ids = None
+        self.idempotency_key = idempotency_key
+
+    @property
+    def encoding(self):
+        """
+        The encoding the body is sent with, ``"GSM-7"`` or ``"UCS-2"``
+        """
+        return encoding.detect_encoding(self.body)
+
+    @property
+    def segment_count(self):
+        """
+        The number of SMS the body is sent as
+        """
+        return encoding.segment_count(self.body)
+
+    def segments(self):
+        """
+        Split the body into the parts of a concatenated SMS
+        """
+        return encoding.split_segments(self.body)
+
+    def to_dict(self):
+        """
+        Return the message as a JSON serializable dict, e.g. to be queued.
+
+        The connection and provider ids are not included.
+        """
+        data = {"body": self.body, "from_phone": self.from_phone, "to": list(self.to)}
+        if self.flash:
+            data["flash"] = True
+        if self.idempotency_key:
+            data["idempotency_key"] = self.idempotency_key
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Create a message from the output of to_dict()
+        """
+        return cls(**data)
 
     def get_connection(self, fail_silently=False):
         if not self.connection:
@@ -44,3 +129,16 @@ class SmsMessage(object):
             sender=self, to=self.to, from_phone=self.from_phone, body=self.body
         )
         return res
+
+    async def asend(self, fail_silently=False):
+        """
+        Asynchronously sends the sms message
+        """
+        if not self.to:
+            # Don't bother creating the connection if there's nobody to send to
+            return 0
+        res = await self.get_connection(fail_silently).asend_messages([self])
+        sms_post_send.send(
+            sender=self, to=self.to, from_phone=self.from_phone, body=self.body
+        )
+        return res
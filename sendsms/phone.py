@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Phone number normalization.
+
+Numbers are normalized to E.164 (``+41791234567``) and then formatted the
+way a backend expects them. Separators are ignored, a ``00`` prefix is read
+as ``+`` and numbers without either are taken as national numbers of the
+default country, dropping a trunk ``0``. Results are memoized, so repeated
+recipients are only parsed once per process.
+
+The backends normalize recipients when planning their requests, invalid
+numbers raise :py:class:`~sendsms.exceptions.InvalidPhoneNumber` before
+anything is sent.
+
+Settings::
+
+    SENDSMS_NORMALIZE_NUMBERS = False  # default
+    SENDSMS_DEFAULT_COUNTRY_CODE = '41'  # for national numbers, default None
+"""
+
+import re
+from functools import lru_cache
+
+from sendsms.exceptions import InvalidPhoneNumber
+
+#: ``+41791234567``
+E164 = "e164"
+#: ``0041791234567``
+INTERNATIONAL = "international"
+#: ``41791234567``
+DIGITS = "digits"
+
+CACHE_SIZE = 65536
+
+E164_RE = re.compile(r"^\+[1-9]\d{6,14}$")
+SEPARATORS_RE = re.compile(r"[\s().\-/]")
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize(number, country_code=None):
+    """
+    Return ``number`` in E.164 format.
+
+    :param str country_code: calling code of national numbers, e.g. ``"41"``
+    :raises InvalidPhoneNumber: if ``number`` is not a valid phone number
+    """
+    cleaned = SEPARATORS_RE.sub("", number)
+    if cleaned.startswith("00"):
+        cleaned = "+" + cleaned[2:]
+    elif not cleaned.startswith("+") and country_code:
+        if cleaned.startswith("0"):
+            cleaned = cleaned[1:]
+        cleaned = "+%s%s" % (country_code, cleaned)
+    if not E164_RE.match(cleaned):
+        raise InvalidPhoneNumber("Invalid phone number: %r" % number)
+    return cleaned
+
+
+def format_number(number, number_format=E164):
+    """
+    Format a normalized ``number`` as ``E164``, ``INTERNATIONAL`` or
+    ``DIGITS``.
+    """
+    if number_format == INTERNATIONAL:
+        return "00" + number[1:]
+    if number_format == DIGITS:
+        return number[1:]
+    return number
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Retry policy for transient provider errors.
+
+Backends apply the policy around every single provider request, so only
+the message (or recipient) which failed is sent again, never the whole
+batch.
+
+Settings::
+
+    SENDSMS_RETRY = {
+        'max_attempts': 3,  # 1 (the default) disables retries
+        'backoff': 0.5,  # seconds before the first retry, doubled every attempt
+        'max_backoff': 30,
+        'jitter': True,  # sleep a random time up to the backoff ("full jitter")
+    }
+"""
+import asyncio
+import random
+import time
+
+from django.conf import settings
+
+
+class RetryPolicy(object):
+    def __init__(
+        self, max_attempts=1, backoff=0.5, max_backoff=30, jitter=True, sleep=None
+    ):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.sleep = sleep or time.sleep
+
+    @classmethod
+    def from_settings(cls):
+        return cls(**getattr(settings, "SENDSMS_RETRY", {}))
+
+    def get_delay(self, attempt):
+        """
+        Return the seconds to wait after the failed ``attempt`` (1-based).
+        """
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def call(self, func, retry_on_exception=None, retry_on_result=None):
+        """
+        Call ``func()`` until it succeeds or ``max_attempts`` is reached.
+
+        :param callable retry_on_exception: returns True if a raised exception
+            is transient.
+        :param callable retry_on_result: returns True if a returned result
+            (e.g. an http response) is a transient failure.
+        :returns: the result of the last attempt. The exception of the last
+            attempt is raised.
+        """
+        attempt = 1
+        while True:
+            try:
+                result = func()
+            except Exception as e:
+                if not self._should_retry(attempt, retry_on_exception, e):
+                    raise
+            else:
+                if not self._should_retry(attempt, retry_on_result, result):
+                    return result
+            self.sleep(self.get_delay(attempt))
+            attempt += 1
+
+    async def acall(self, func, retry_on_exception=None, retry_on_result=None):
+        """
+        Asynchronous version of call(), ``func()`` must return an awaitable.
+        """
+        attempt = 1
+        while True:
+            try:
+                result = await func()
+            except Exception as e:
+                if not self._should_retry(attempt, retry_on_exception, e):
+                    raise
+            else:
+                if not self._should_retry(attempt, retry_on_result, result):
+                    return result
+            await asyncio.sleep(self.get_delay(attempt))
+            attempt += 1
+
+    def _should_retry(self, attempt, classifier, value):
+        return (
+            attempt < self.max_attempts and classifier is not None and classifier(value)
+        )
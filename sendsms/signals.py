@@ -2,3 +2,8 @@
 from django.dispatch import Signal
 
 sms_post_send = Signal()  # providing_args=["from_phone", "to", "body"]
+
+# Sent once per send_messages() call, sender is the backend class.
+# providing_args=["backend", "messages", "outcomes", "sent", "exception"]
+# outcomes holds one True/False per message, or None where it is not known.
+sms_batch_sent = Signal()
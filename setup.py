@@ -18,6 +18,7 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     extras_require={
+        "async": ["httpx"],
         "bulksms": ["requests"],
         "celery": ["celery"],
         "esendex": ["requests"],
@@ -27,7 +28,15 @@ setup(
         "twilio": ["twilio"],
     },
     test_suite="test",
-    tests_require=["mock", "django", "requests", "django_rq", "twilio", "celery"],
+    tests_require=[
+        "mock",
+        "django",
+        "requests",
+        "httpx",
+        "django_rq",
+        "twilio",
+        "celery",
+    ],
     zip_safe=False,
     classifiers=[
         "Development Status :: 5 - Production/Stable",
@@ -5,17 +5,21 @@ try:
 except:
     import mock
 
-try:
-    from importlib import reload
-except:
-    pass
-
+import asyncio
+import io
+import os
+import tempfile
+import threading
+import time
 import unittest
 
+import django
 from django.conf import settings
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, override_settings
 
 import sendsms
+from sendsms.backends.base import BaseSmsBackend
+from sendsms.backends.locmem import reset_outbox
 
 if not settings.configured:
     settings.configure(
@@ -27,7 +31,13 @@ if not settings.configured:
         RQ_QUEUES={"default": {"URL": "redis://localhost", "DEFAULT_TIMEOUT": 500}},
         RQ_SENDSMS_BACKEND="sendsms.backends.locmem.SmsBackend",
         CELERY_SENDSMS_BACKEND="sendsms.backends.locmem.SmsBackend",
+        DBQUEUE_SENDSMS_BACKEND="sendsms.backends.locmem.SmsBackend",
+        INSTALLED_APPS=["sendsms.dbqueue"],
+        DATABASES={
+            "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}
+        },
     )
+    django.setup()
 
 
 class TestApi(unittest.TestCase):
@@ -51,9 +61,1274 @@ class TestApi(unittest.TestCase):
         self.assertEqual(res, 1)
 
 
+class GetConnectionTest(SimpleTestCase):
+    def test_backend_class_is_cached(self):
+        from sendsms.api import get_connection, load_backend
+
+        load_backend.cache_clear()
+        get_connection("sendsms.backends.dummy.SmsBackend")
+        get_connection("sendsms.backends.dummy.SmsBackend")
+        self.assertEqual(load_backend.cache_info().hits, 1)
+
+    def test_cache_is_cleared_on_setting_changed(self):
+        from sendsms.api import get_connection, load_backend
+
+        get_connection()
+        with self.settings(SENDSMS_BACKEND="sendsms.backends.dummy.SmsBackend"):
+            self.assertEqual(load_backend.cache_info().currsize, 0)
+            connection = get_connection()
+        self.assertEqual(type(connection).__module__, "sendsms.backends.dummy")
+
+    @mock.patch("sendsms.api.get_connection")
+    def test_worker_connection_is_closed_on_setting_changed(self, get_connection_mock):
+        from sendsms.api import close_worker_connections, get_worker_connection
+
+        close_worker_connections()
+        connection = get_worker_connection("sendsms.backends.locmem.SmsBackend")
+        with self.settings(SENDSMS_MAX_WORKERS=2):
+            connection.close.assert_called_once_with()
+            get_worker_connection("sendsms.backends.locmem.SmsBackend")
+        self.assertEqual(get_connection_mock.call_count, 2)
+
+
+class HttpSessionTest(SimpleTestCase):
+    @mock.patch("requests.Session.request")
+    def test_session_is_reused_on_opened_connection(self, request_mock):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+
+        request_mock.return_value = mock.Mock(status_code=200, content=b"Result=OK")
+        connection = get_connection("sendsms.backends.esendex.SmsBackend")
+        messages = [
+            SmsMessage(body="test %d" % i, from_phone="111111111", to=["222222222"])
+            for i in range(3)
+        ]
+
+        self.assertTrue(connection.open())
+        session = connection.session
+        self.assertFalse(connection.open())
+        self.assertEqual(connection.send_messages(messages), 3)
+        self.assertEqual(connection.send_messages(messages), 3)
+        self.assertIs(connection.session, session)
+        connection.close()
+
+        self.assertIsNone(connection.session)
+        self.assertEqual(request_mock.call_count, 6)
+
+    @mock.patch("requests.Session.request")
+    def test_session_is_closed_after_unopened_send(self, request_mock):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+
+        request_mock.return_value = mock.Mock(status_code=200, content=b"Result=OK")
+        connection = get_connection("sendsms.backends.esendex.SmsBackend")
+        message = SmsMessage(body="test", from_phone="111111111", to=["222222222"])
+        self.assertEqual(connection.send_messages([message]), 1)
+        self.assertIsNone(connection.session)
+
+
+class ConcurrentDispatchTest(SimpleTestCase):
+    def test_results_keep_input_order(self):
+        from sendsms.backends.base import BaseSmsBackend
+
+        backend = BaseSmsBackend(max_workers=4)
+        self.assertEqual(
+            backend._dispatch(lambda i: i * 2, range(10)), list(range(0, 20, 2))
+        )
+
+    def test_first_failure_in_input_order_is_raised(self):
+        from sendsms.backends.base import BaseSmsBackend
+
+        called = []
+
+        def func(i):
+            called.append(i)
+            if i in (3, 7):
+                raise ValueError(i)
+            return i
+
+        backend = BaseSmsBackend(max_workers=4)
+        with self.assertRaisesRegex(ValueError, "3"):
+            backend._dispatch(func, range(10))
+        self.assertEqual(sorted(called), list(range(10)))
+
+    @mock.patch("requests.Session.request")
+    def test_concurrent_send_messages_count(self, request_mock):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+
+        request_mock.return_value = mock.Mock(status_code=200, content=b"Result=OK")
+        messages = [
+            SmsMessage(body="test", from_phone="111111111", to=["222222222"])
+            for i in range(20)
+        ]
+        with self.settings(SENDSMS_MAX_WORKERS=8):
+            connection = get_connection("sendsms.backends.esendex.SmsBackend")
+            self.assertEqual(connection.send_messages(messages), 20)
+
+
+class ConnectionReuseTest(SimpleTestCase):
+    def test_context_manager_keeps_stream_open(self):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+
+        message = SmsMessage(body="test", from_phone="111111111", to=["222222222"])
+        with tempfile.TemporaryDirectory() as file_path:
+            with get_connection(
+                "sendsms.backends.filebased.SmsBackend", file_path=file_path
+            ) as connection:
+                stream = connection.stream
+                connection.send_messages([message])
+                connection.send_messages([message])
+                self.assertIs(connection.stream, stream)
+            self.assertIsNone(connection.stream)
+            self.assertEqual(len(os.listdir(file_path)), 1)
+
+    @mock.patch("requests.Session.request")
+    def test_send_mass_sms_uses_single_connection(self, request_mock):
+        from sendsms.api import get_connection, send_mass_sms
+
+        request_mock.return_value = mock.Mock(status_code=200, content=b"Result=OK")
+        connection = get_connection("sendsms.backends.esendex.SmsBackend")
+        datatuple = [("test", "111111111", ["222222222"], False)] * 3
+        with mock.patch.object(
+            connection, "close", wraps=connection.close
+        ) as close_mock:
+            self.assertEqual(send_mass_sms(datatuple, connection=connection), 3)
+        close_mock.assert_called_once_with()
+
+        with connection:
+            session = connection.session
+            send_mass_sms(datatuple, connection=connection)
+            self.assertIs(connection.session, session)
+
+
+class SmsMessageTest(SimpleTestCase):
+    def test_tuple_recipients_are_not_copied(self):
+        from sendsms.message import SmsMessage
+
+        to = ("222222222", "333333333")
+        self.assertIs(SmsMessage(body="test", to=to).to, to)
+        self.assertEqual(SmsMessage(body="test", to=iter(to)).to, list(to))
+        self.assertFalse(hasattr(SmsMessage(body="test"), "__dict__"))
+
+    def test_default_from_phone_follows_settings(self):
+        from sendsms.message import SmsMessage
+
+        self.assertEqual(SmsMessage(body="test").from_phone, "")
+        with self.settings(SENDSMS_DEFAULT_FROM_PHONE="111111111"):
+            self.assertEqual(SmsMessage(body="test").from_phone, "111111111")
+        self.assertEqual(SmsMessage(body="test").from_phone, "")
+
+
+class SendMassSmsTest(SimpleTestCase):
+    def test_generator_is_sent_in_chunks(self):
+        from sendsms.api import get_connection, send_mass_sms
+
+        connection = get_connection("sendsms.backends.dummy.SmsBackend")
+        datatuple = (
+            ("test %d" % i, "111111111", ["222222222"], False) for i in range(5)
+        )
+        progress = []
+        with mock.patch.object(
+            connection, "send_messages", wraps=connection.send_messages
+        ) as send_messages_mock:
+            sent = send_mass_sms(
+                datatuple,
+                connection=connection,
+                chunk_size=2,
+                progress_callback=lambda *args: progress.append(args),
+            )
+
+        self.assertEqual(sent, 5)
+        self.assertEqual(
+            [len(call[0][0]) for call in send_messages_mock.call_args_list], [2, 2, 1]
+        )
+        self.assertEqual(progress, [(2, 2), (4, 4), (5, 5)])
+
+
+class BatchSignalTest(SimpleTestCase):
+    def setUp(self):
+        from sendsms.signals import sms_batch_sent
+
+        self.calls = []
+        sms_batch_sent.connect(self.receiver)
+        self.addCleanup(sms_batch_sent.disconnect, self.receiver)
+        reset_outbox()
+
+    def tearDown(self):
+        reset_outbox()
+
+    def receiver(self, sender, **kwargs):
+        self.calls.append((sender, kwargs))
+
+    def test_sent_once_per_send_messages_call(self):
+        from sendsms.api import send_mass_sms
+        from sendsms.backends.locmem import SmsBackend
+
+        datatuple = [("test", "111111111", ["222222222"], False)] * 3
+        send_mass_sms(datatuple)
+
+        self.assertEqual(len(self.calls), 1)
+        sender, kwargs = self.calls[0]
+        self.assertIs(sender, SmsBackend)
+        self.assertEqual(len(kwargs["messages"]), 3)
+        self.assertEqual(kwargs["outcomes"], [True, True, True])
+        self.assertEqual(kwargs["sent"], 3)
+
+    @mock.patch("requests.Session.request")
+    def test_per_message_outcomes(self, request_mock):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+
+        request_mock.side_effect = [
+            mock.Mock(status_code=200, content=b"Result=OK"),
+            mock.Mock(status_code=500, content=b""),
+        ]
+        connection = get_connection(
+            "sendsms.backends.esendex.SmsBackend", fail_silently=True
+        )
+        messages = [
+            SmsMessage(body="first", from_phone="111111111", to=["222222222"]),
+            SmsMessage(body="second", from_phone="111111111", to=["333333333"]),
+        ]
+        self.assertEqual(connection.send_messages(messages), 1)
+        self.assertEqual(self.calls[0][1]["outcomes"], [True, False])
+
+    def test_exception_is_reported(self):
+        from sendsms.backends.base import BaseSmsBackend
+        from sendsms.message import SmsMessage
+
+        class FailingBackend(BaseSmsBackend):
+            def send_messages(self, messages):
+                raise ValueError("down")
+
+        with self.assertRaises(ValueError):
+            FailingBackend().send_messages([SmsMessage(body="test", to=["1"])])
+        self.assertIsInstance(self.calls[0][1]["exception"], ValueError)
+        self.assertEqual(self.calls[0][1]["outcomes"], [None])
+
+
+class BulkSmsBackendTest(SimpleTestCase):
+    @mock.patch("requests.Session.request")
+    def test_chunked_submission(self, request_mock):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+
+        def request(method, url, json, **kwargs):
+            return mock.Mock(
+                status_code=201,
+                json=lambda: [
+                    {
+                        "id": "id-%s" % to,
+                        "status": {"type": "FAILED" if to == "d" else "ACCEPTED"},
+                    }
+                    for entry in json
+                    for to in entry["to"]
+                ],
+            )
+
+        request_mock.side_effect = request
+        messages = [
+            SmsMessage(body="test", from_phone="1", to=["a", "b", "c"]),
+            SmsMessage(body="test", from_phone="1", to=["d"]),
+            SmsMessage(body="test", from_phone="1", to=["e"]),
+        ]
+        with self.settings(
+            SENDSMS_MAX_RECIPIENTS={"sendsms.backends.bulksms.SmsBackend": 2}
+        ):
+            connection = get_connection("sendsms.backends.bulksms.SmsBackend")
+
+        self.assertEqual(connection.send_messages(messages), 2)
+        self.assertEqual(
+            [call[1]["json"] for call in request_mock.call_args_list],
+            [
+                [{"from": "1", "to": ["a", "b"], "body": "test"}],
+                [{"from": "1", "to": ["c", "d"], "body": "test"}],
+                [{"from": "1", "to": ["e"], "body": "test"}],
+            ],
+        )
+        self.assertEqual(messages[0].provider_ids, ["id-a", "id-b", "id-c"])
+        self.assertEqual(messages[1].provider_ids, ["id-d"])
+
+    @mock.patch("requests.Session.request")
+    def test_concurrent_chunks_keep_id_order(self, request_mock):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+
+        def request(method, url, json, **kwargs):
+            if json[0]["to"][0] == "a":
+                # the first chunk answers last
+                time.sleep(0.05)
+            return mock.Mock(
+                status_code=201,
+                json=lambda: [{"id": "id-%s" % to} for to in json[0]["to"]],
+            )
+
+        request_mock.side_effect = request
+        message = SmsMessage(body="test", from_phone="1", to=["a", "b", "c", "d"])
+        connection = get_connection(
+            "sendsms.backends.bulksms.SmsBackend", max_workers=4, max_recipients=1
+        )
+
+        self.assertEqual(connection.send_messages([message]), 1)
+        self.assertEqual(message.provider_ids, ["id-a", "id-b", "id-c", "id-d"])
+
+    @mock.patch("requests.Session.request")
+    @override_settings(
+        SENDSMS_NORMALIZE_NUMBERS=True, SENDSMS_DEFAULT_COUNTRY_CODE="41"
+    )
+    def test_recipients_are_normalized(self, request_mock):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+
+        request_mock.return_value = mock.Mock(status_code=201, json=lambda: [])
+        message = SmsMessage(body="test", from_phone="1", to=["079 123 45 67"])
+        connection = get_connection("sendsms.backends.bulksms.SmsBackend")
+        self.assertEqual(connection.send_messages([message]), 1)
+        self.assertEqual(request_mock.call_args[1]["json"][0]["to"], ["+41791234567"])
+
+
+class TwilioBackendTest(SimpleTestCase):
+    @mock.patch("twilio.rest.Client")
+    def test_client_is_reused_and_sids_attached(self, client_class):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+
+        client_class.return_value.messages.create.side_effect = lambda to, **kw: (
+            mock.Mock(sid="SM-%s" % to)
+        )
+        messages = [
+            SmsMessage(body="Hello!", from_phone="29290", to=["+1", "+2"]),
+            SmsMessage(body="Hello!", from_phone="29290", to=["+3"]),
+        ]
+        with self.settings(SENDSMS_TWILIO_MAX_WORKERS=4):
+            connection = get_connection("sendsms.backends.twiliorest.SmsBackend")
+        with connection:
+            self.assertEqual(connection.send_messages(messages[:1]), 2)
+            self.assertEqual(connection.send_messages(messages[1:]), 1)
+
+        self.assertEqual(client_class.call_count, 1)
+        self.assertEqual(connection.max_workers, 4)
+        self.assertEqual(messages[0].provider_ids, ["SM-+1", "SM-+2"])
+        self.assertEqual(messages[1].provider_ids, ["SM-+3"])
+        self.assertIsNone(connection.client)
+
+    @mock.patch("twilio.rest.Client")
+    @override_settings(SENDSMS_NORMALIZE_NUMBERS=True)
+    def test_invalid_number_is_rejected_before_sending(self, client_class):
+        from sendsms.api import get_connection
+        from sendsms.exceptions import InvalidPhoneNumber
+        from sendsms.message import SmsMessage
+
+        message = SmsMessage(body="Hello!", from_phone="1", to=["+41791234567", "123"])
+        connection = get_connection("sendsms.backends.twiliorest.SmsBackend")
+        with self.assertRaises(InvalidPhoneNumber):
+            connection.send_messages([message])
+        self.assertFalse(client_class.return_value.messages.create.called)
+
+
+class FakeClock(object):
+    def __init__(self, now=100.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+class RateLimitBackendTest(SimpleTestCase):
+    def setUp(self):
+        reset_outbox()
+
+    def tearDown(self):
+        reset_outbox()
+
+    def test_token_bucket_spaces_out_messages(self):
+        from sendsms.backends.ratelimit import TokenBucket
+
+        clock = FakeClock()
+        bucket = TokenBucket(10, clock=clock, sleep=clock.sleep)
+        for i in range(4):
+            bucket.acquire()
+        self.assertEqual(clock.sleeps, [0.1, 0.1, 0.1])
+
+    def test_cache_token_bucket_waits_for_next_window(self):
+        from django.core.cache import caches
+
+        from sendsms.backends.ratelimit import CacheTokenBucket
+
+        clock = FakeClock(200.5)
+        cache = caches["default"]
+        cache.clear()
+        bucket = CacheTokenBucket("test", 2, cache, clock=clock, sleep=clock.sleep)
+        other_process = CacheTokenBucket("test", 2, cache, clock=clock)
+        bucket.acquire()
+        other_process.acquire()
+        bucket.acquire()
+        # the two tokens taken at 200.5 only slide out of the window at 201.5
+        self.assertEqual(clock.sleeps, [0.5, 0.5])
+        self.assertEqual(cache.get("test:201"), 1)
+
+    def test_cache_token_bucket_slices_large_requests(self):
+        from django.core.cache import caches
+
+        from sendsms.backends.ratelimit import CacheTokenBucket
+
+        clock = FakeClock(300.0)
+        cache = caches["default"]
+        cache.clear()
+        bucket = CacheTokenBucket("test", 5, cache, clock=clock, sleep=clock.sleep)
+        for i in range(3):
+            bucket.acquire(10)
+        # 30 tokens at 5 per second, the first 5 are taken right away
+        self.assertGreaterEqual(clock.now, 305.0)
+
+    def test_backend_forwards_rate_limited_messages(self):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+
+        with self.settings(
+            RATELIMIT_SENDSMS_BACKEND="sendsms.backends.locmem.SmsBackend",
+            SENDSMS_RATE_LIMITS={"sendsms.backends.locmem.SmsBackend": 1000},
+        ):
+            connection = get_connection("sendsms.backends.ratelimit.SmsBackend")
+        with mock.patch.object(connection.bucket, "acquire") as acquire_mock:
+            sent = connection.send_messages(
+                [
+                    SmsMessage(body="test", from_phone="1", to=["2", "3"]),
+                    SmsMessage(body="test", from_phone="1", to=["4"]),
+                ]
+            )
+        self.assertEqual(sent, 2)
+        self.assertEqual(len(sendsms.outbox), 2)
+        self.assertEqual(acquire_mock.call_args_list, [mock.call(2), mock.call(1)])
+
+    def test_backend_splits_messages_above_the_rate(self):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+
+        with self.settings(
+            RATELIMIT_SENDSMS_BACKEND="sendsms.backends.locmem.SmsBackend",
+            SENDSMS_RATE_LIMITS={"sendsms.backends.locmem.SmsBackend": 2},
+        ):
+            connection = get_connection("sendsms.backends.ratelimit.SmsBackend")
+        message = SmsMessage(body="test", from_phone="1", to=["2", "3", "4"])
+        with mock.patch.object(connection.bucket, "acquire") as acquire_mock:
+            self.assertEqual(connection.send_messages([message]), 1)
+        self.assertEqual(acquire_mock.call_args_list, [mock.call(2), mock.call(1)])
+        self.assertEqual([m.to for m in sendsms.outbox], [["2", "3"], ["4"]])
+
+
+class RetryTest(SimpleTestCase):
+    def test_backoff_grows_exponentially(self):
+        from sendsms.retry import RetryPolicy
+
+        policy = RetryPolicy(max_attempts=5, backoff=1, max_backoff=5, jitter=False)
+        self.assertEqual([policy.get_delay(i) for i in range(1, 5)], [1, 2, 4, 5])
+        policy.jitter = True
+        self.assertTrue(0 <= policy.get_delay(3) <= 4)
+
+    @mock.patch("requests.Session.request")
+    def test_only_failed_messages_are_retried(self, request_mock):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+        from sendsms.retry import RetryPolicy
+
+        ok = mock.Mock(status_code=200, content=b"Result=OK")
+        request_mock.side_effect = [
+            ok,
+            mock.Mock(status_code=503, content=b""),
+            ok,
+        ]
+        sleeps = []
+        connection = get_connection(
+            "sendsms.backends.esendex.SmsBackend",
+            retry_policy=RetryPolicy(max_attempts=3, sleep=sleeps.append),
+        )
+        messages = [
+            SmsMessage(body="first", from_phone="1", to=["222222222"]),
+            SmsMessage(body="second", from_phone="1", to=["333333333"]),
+        ]
+
+        self.assertEqual(connection.send_messages(messages), 2)
+        recipients = [
+            call[1]["data"]["EsendexRecipient"] for call in request_mock.call_args_list
+        ]
+        self.assertEqual(recipients, ["222222222", "333333333", "333333333"])
+        self.assertEqual(len(sleeps), 1)
+
+    @mock.patch("requests.Session.request")
+    def test_nexmo_throttled_is_retried(self, request_mock):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+        from sendsms.retry import RetryPolicy
+
+        def response(status):
+            return mock.Mock(
+                status_code=200, json=lambda: {"messages": [{"status": status}]}
+            )
+
+        request_mock.side_effect = [response("1"), response("0")]
+        connection = get_connection(
+            "sendsms.backends.nexmo.SmsBackend",
+            retry_policy=RetryPolicy(max_attempts=2, sleep=lambda delay: None),
+        )
+        message = SmsMessage(body="test", from_phone="1", to=["222222222"])
+        self.assertEqual(connection.send_messages([message]), 1)
+        self.assertEqual(request_mock.call_count, 2)
+
+
+class FailingSmsBackend(BaseSmsBackend):
+    calls = 0
+
+    def send_messages(self, messages):
+        FailingSmsBackend.calls += 1
+        raise IOError("provider down")
+
+
+# the test module is __main__ when run with "python test.py"
+FAILING_BACKEND = "%s.FailingSmsBackend" % __name__
+
+
+class FlakySmsBackend(BaseSmsBackend):
+    calls = 0
+    fail = False
+
+    def send_messages(self, messages):
+        FlakySmsBackend.calls += 1
+        if FlakySmsBackend.fail:
+            raise IOError("provider down")
+        return len(messages)
+
+
+FLAKY_BACKEND = "%s.FlakySmsBackend" % __name__
+
+
+class SilentSmsBackend(BaseSmsBackend):
+    def send_messages(self, messages):
+        return 0
+
+
+class FailoverBackendTest(SimpleTestCase):
+    def setUp(self):
+        from sendsms.backends import failover
+
+        failover._health.clear()
+        FailingSmsBackend.calls = 0
+        FlakySmsBackend.calls = 0
+        FlakySmsBackend.fail = False
+        reset_outbox()
+
+    def tearDown(self):
+        reset_outbox()
+
+    def test_failing_backend_is_bypassed(self):
+        from sendsms.api import send_sms
+
+        with self.settings(
+            SENDSMS_BACKEND="sendsms.backends.failover.SmsBackend",
+            FAILOVER_SENDSMS_BACKENDS=[
+                FAILING_BACKEND,
+                "sendsms.backends.locmem.SmsBackend",
+            ],
+            SENDSMS_FAILOVER_FAILURE_THRESHOLD=1,
+        ):
+            self.assertEqual(send_sms("test", "1", ["2"]), 1)
+            self.assertEqual(send_sms("test", "1", ["3"]), 1)
+
+        self.assertEqual(FailingSmsBackend.calls, 1)
+        self.assertEqual(len(sendsms.outbox), 2)
+
+    def test_round_robin_spreads_messages(self):
+        from sendsms.api import send_mass_sms
+
+        with self.settings(
+            SENDSMS_BACKEND="sendsms.backends.failover.SmsBackend",
+            FAILOVER_SENDSMS_BACKENDS=[
+                "sendsms.backends.dummy.SmsBackend",
+                "sendsms.backends.locmem.SmsBackend",
+            ],
+            SENDSMS_FAILOVER_STRATEGY="round_robin",
+        ):
+            self.assertEqual(send_mass_sms([("test", "1", ["2"], False)] * 4), 4)
+
+        self.assertEqual(len(sendsms.outbox), 2)
+
+    def test_all_backends_failing_raises(self):
+        from sendsms.api import send_sms
+
+        with self.settings(
+            SENDSMS_BACKEND="sendsms.backends.failover.SmsBackend",
+            FAILOVER_SENDSMS_BACKENDS=[FAILING_BACKEND],
+        ):
+            with self.assertRaises(IOError):
+                send_sms("test", "1", ["2"])
+            self.assertEqual(send_sms("test", "1", ["2"], fail_silently=True), 0)
+
+    @mock.patch("requests.Session.request")
+    def test_only_unsent_messages_fail_over(self, request_mock):
+        from sendsms.api import send_mass_sms
+
+        request_mock.side_effect = [
+            mock.Mock(status_code=200, content=b"Result=OK"),
+            mock.Mock(status_code=500, content=b""),
+        ]
+        with self.settings(
+            SENDSMS_BACKEND="sendsms.backends.failover.SmsBackend",
+            FAILOVER_SENDSMS_BACKENDS=[
+                "sendsms.backends.esendex.SmsBackend",
+                "sendsms.backends.locmem.SmsBackend",
+            ],
+        ):
+            datatuple = [("first", "1", ["2"], False), ("second", "1", ["3"], False)]
+            self.assertEqual(send_mass_sms(datatuple), 2)
+
+        self.assertEqual(request_mock.call_count, 2)
+        self.assertEqual([m.body for m in sendsms.outbox], ["second"])
+
+    def test_silent_failure_counts_as_failure(self):
+        from sendsms.api import send_sms
+        from sendsms.backends import failover
+
+        path = "%s.SilentSmsBackend" % __name__
+        with self.settings(
+            SENDSMS_BACKEND="sendsms.backends.failover.SmsBackend",
+            FAILOVER_SENDSMS_BACKENDS=[path],
+            SENDSMS_FAILOVER_FAILURE_THRESHOLD=1,
+        ):
+            self.assertEqual(send_sms("test", "1", ["2"]), 0)
+        self.assertFalse(failover.get_health(path).is_available())
+
+    def test_single_trial_after_cooldown(self):
+        from sendsms.backends.failover import BackendHealth
+
+        clock = FakeClock()
+        health = BackendHealth(clock=clock)
+        health.record_failure(threshold=1, cooldown=30)
+        self.assertFalse(health.is_available())
+        clock.now += 31
+        self.assertTrue(health.is_available())
+        self.assertTrue(health.is_available())
+        self.assertTrue(health.claim())
+        self.assertFalse(health.claim())
+        self.assertFalse(health.is_available())
+        health.record_success(0.1)
+        self.assertTrue(health.claim())
+
+    def test_recovered_backend_stays_a_failover_candidate(self):
+        from sendsms.api import send_sms
+        from sendsms.backends import failover
+
+        locmem = "sendsms.backends.locmem.SmsBackend"
+        clock = FakeClock()
+        health = failover.get_health(locmem)
+        health.clock = clock
+        health.record_failure(threshold=1, cooldown=30)
+        clock.now += 31
+
+        with self.settings(
+            SENDSMS_BACKEND="sendsms.backends.failover.SmsBackend",
+            FAILOVER_SENDSMS_BACKENDS=[FLAKY_BACKEND, locmem],
+        ):
+            self.assertEqual(send_sms("test", "1", ["2"]), 1)
+            FlakySmsBackend.fail = True
+            self.assertEqual(send_sms("test", "1", ["3"]), 1)
+
+        self.assertEqual(FlakySmsBackend.calls, 2)
+        self.assertEqual([m.to for m in sendsms.outbox], [["3"]])
+
+
+class CircuitBreakerBackendTest(SimpleTestCase):
+    def setUp(self):
+        from django.core.cache import caches
+
+        caches["default"].clear()
+        FailingSmsBackend.calls = 0
+        reset_outbox()
+
+    def tearDown(self):
+        reset_outbox()
+
+    def get_connection(self, **settings):
+        from sendsms.api import get_connection
+
+        with self.settings(
+            CIRCUITBREAKER_SENDSMS_BACKEND=FAILING_BACKEND,
+            SENDSMS_CIRCUIT_BREAKER={"minimum_calls": 2, "cooldown": 30},
+            **settings
+        ):
+            connection = get_connection("sendsms.backends.circuitbreaker.SmsBackend")
+        connection.breaker.clock = self.clock
+        return connection
+
+    def test_open_circuit_fails_fast(self):
+        from sendsms.exceptions import CircuitOpenError
+        from sendsms.message import SmsMessage
+
+        self.clock = FakeClock()
+        message = SmsMessage(body="test", from_phone="1", to=["2"])
+        for i in range(2):
+            with self.assertRaises(IOError):
+                self.get_connection().send_messages([message])
+
+        with self.assertRaises(CircuitOpenError):
+            self.get_connection().send_messages([message])
+        self.assertEqual(FailingSmsBackend.calls, 2)
+
+        # half-open: one trial batch, which fails and opens the circuit again
+        self.clock.now += 31
+        with self.assertRaises(IOError):
+            self.get_connection().send_messages([message])
+        self.assertEqual(self.get_connection().breaker.state, "open")
+        self.assertEqual(FailingSmsBackend.calls, 3)
+
+    def test_only_the_trial_closes_the_circuit(self):
+        from sendsms.backends.circuitbreaker import CLOSED, HALF_OPEN, OPEN
+
+        self.clock = FakeClock()
+        breaker = self.get_connection().breaker
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        # a batch started before the circuit opened
+        breaker.record_success()
+        self.assertEqual(breaker.state, OPEN)
+
+        self.clock.now += 31
+        self.assertEqual(breaker.allow(), HALF_OPEN)
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, HALF_OPEN)
+        breaker.record_success(trial=True)
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_open_circuit_uses_fallback(self):
+        from sendsms.message import SmsMessage
+
+        self.clock = FakeClock()
+        connection = self.get_connection(
+            CIRCUITBREAKER_SENDSMS_FALLBACK_BACKEND="sendsms.backends.locmem.SmsBackend"
+        )
+        connection.breaker.open()
+        message = SmsMessage(body="test", from_phone="1", to=["2"])
+
+        self.assertEqual(connection.send_messages([message]), 1)
+        self.assertEqual(len(sendsms.outbox), 1)
+        self.assertEqual(FailingSmsBackend.calls, 0)
+
+    def test_fallback_is_opened_with_the_connection(self):
+        self.clock = FakeClock()
+        connection = self.get_connection(
+            CIRCUITBREAKER_SENDSMS_FALLBACK_BACKEND="sendsms.backends.esendex.SmsBackend"
+        )
+        with connection:
+            self.assertIsNotNone(connection.fallback.session)
+        self.assertIsNone(connection.fallback.session)
+
+
+class TimeoutTest(SimpleTestCase):
+    def test_default_and_per_backend_timeout(self):
+        from sendsms.api import get_connection
+
+        with self.settings(SENDSMS_TIMEOUT=(2, 10)):
+            self.assertEqual(
+                get_connection("sendsms.backends.esendex.SmsBackend").timeout, (2, 10)
+            )
+        with self.settings(
+            SENDSMS_TIMEOUT=(2, 10),
+            SENDSMS_TIMEOUTS={"sendsms.backends.esendex.SmsBackend": (1, 5)},
+        ):
+            self.assertEqual(
+                get_connection("sendsms.backends.esendex.SmsBackend").timeout, (1, 5)
+            )
+            self.assertEqual(
+                get_connection("sendsms.backends.nexmo.SmsBackend").timeout, (2, 10)
+            )
+        connection = get_connection("sendsms.backends.esendex.SmsBackend", timeout=3)
+        self.assertEqual(connection.timeout, 3)
+
+    @mock.patch("requests.Session.request")
+    def test_timeout_is_passed_and_translated(self, request_mock):
+        import requests
+
+        from sendsms.api import get_connection
+        from sendsms.exceptions import SmsTimeout
+        from sendsms.message import SmsMessage
+
+        request_mock.side_effect = requests.ReadTimeout()
+        connection = get_connection("sendsms.backends.esendex.SmsBackend", timeout=4)
+        message = SmsMessage(body="test", from_phone="111111111", to=["222222222"])
+
+        with self.assertRaises(SmsTimeout):
+            connection.send_messages([message])
+        self.assertEqual(request_mock.call_args[1]["timeout"], 4)
+        self.assertTrue(connection.is_retryable_exception(SmsTimeout()))
+
+
+class SmsGlobalBackendTest(SimpleTestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+
+    @mock.patch("requests.Session.request")
+    def test_send_messages(self, request_mock):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+
+        request_mock.return_value = mock.Mock(
+            status_code=200,
+            text="OK: 0; Sent queued message ID: 2063619577732703 "
+            "SMSGlobalMsgID:6171799108850954",
+        )
+        connection = get_connection("sendsms.backends.smsglobal.SmsBackend")
+        messages = [
+            SmsMessage(body="test %d" % i, from_phone="111111111", to=["222222222"])
+            for i in range(2)
+        ]
+        self.assertEqual(connection.send_messages(messages), 2)
+        self.assertEqual(request_mock.call_count, 2)
+
+    @mock.patch("requests.Session.request")
+    @override_settings(SMSGLOBAL_CHECK_BALANCE_COUNTRY="AU")
+    def test_balance_is_cached(self, request_mock):
+        from sendsms.api import get_connection
+
+        request_mock.return_value = mock.Mock(
+            status_code=200, text="CREDITS:8658.44;COUNTRY:AU;SMS:3764.54;"
+        )
+        connection = get_connection("sendsms.backends.smsglobal.SmsBackend")
+        balance = {"credits": "8658.44", "country": "AU", "sms": "3764.54"}
+        self.assertEqual(connection.get_balance(), balance)
+        self.assertEqual(connection.get_balance(), balance)
+        self.assertEqual(request_mock.call_count, 1)
+        connection.get_balance(refresh=True)
+        self.assertEqual(request_mock.call_count, 2)
+
+
+class DbQueueTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from django.core.management import call_command
+
+        call_command("migrate", "sendsms_dbqueue", verbosity=0)
+        super(DbQueueTest, cls).setUpClass()
+
+    def setUp(self):
+        reset_outbox()
+
+    def tearDown(self):
+        reset_outbox()
+
+    def queue(self, count):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+
+        connection = get_connection("sendsms.backends.dbqueue.SmsBackend")
+        messages = [
+            SmsMessage(body="test %d" % i, from_phone="1", to=["2", "3"])
+            for i in range(count)
+        ]
+        with self.assertNumQueries(1):
+            self.assertEqual(connection.send_messages(messages), count)
+
+    def test_dispatch_sends_queued_messages(self):
+        from django.core.management import call_command
+
+        from sendsms.dbqueue.models import OutboundSms
+
+        self.queue(5)
+        self.assertEqual(len(sendsms.outbox), 0)
+        call_command("sendsms_dispatch", batch_size=2, stdout=io.StringIO())
+
+        self.assertEqual(
+            [m.body for m in sendsms.outbox], ["test %d" % i for i in range(5)]
+        )
+        self.assertEqual(sendsms.outbox[0].to, ["2", "3"])
+        self.assertEqual(OutboundSms.objects.filter(status=OutboundSms.SENT).count(), 5)
+
+    def test_claims_are_disjoint(self):
+        from sendsms.dbqueue.models import OutboundSms
+
+        self.queue(3)
+        first = OutboundSms.objects.claim(2)
+        second = OutboundSms.objects.claim(2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertEqual(OutboundSms.objects.claim(2), [])
+
+    def test_failed_batch_is_requeued(self):
+        from sendsms.dbqueue.dispatcher import dispatch
+        from sendsms.dbqueue.models import OutboundSms
+
+        self.queue(1)
+        FailingSmsBackend.calls = 0
+        with self.settings(
+            DBQUEUE_SENDSMS_BACKEND=FAILING_BACKEND,
+            SENDSMS_DBQUEUE_MAX_ATTEMPTS=2,
+        ):
+            with self.assertRaises(IOError):
+                dispatch()
+            row = OutboundSms.objects.get()
+            self.assertEqual((row.status, row.attempts), (OutboundSms.QUEUED, 1))
+            with self.assertRaises(IOError):
+                dispatch()
+        row = OutboundSms.objects.get()
+        self.assertEqual((row.status, row.attempts), (OutboundSms.FAILED, 2))
+        self.assertEqual(FailingSmsBackend.calls, 2)
+
+    @mock.patch("requests.Session.request")
+    def test_delivered_rows_are_not_requeued(self, request_mock):
+        from sendsms.dbqueue.dispatcher import dispatch
+        from sendsms.dbqueue.models import OutboundSms
+
+        request_mock.side_effect = [
+            mock.Mock(status_code=200, content=b"Result=OK"),
+            mock.Mock(status_code=500, content=b""),
+        ]
+        self.queue(2)
+        with self.settings(
+            DBQUEUE_SENDSMS_BACKEND="sendsms.backends.esendex.SmsBackend"
+        ):
+            with self.assertRaises(Exception):
+                dispatch()
+        self.assertEqual(
+            list(OutboundSms.objects.order_by("pk").values_list("status", "attempts")),
+            [(OutboundSms.SENT, 1), (OutboundSms.QUEUED, 1)],
+        )
+
+
+class DedupBackendTest(SimpleTestCase):
+    def setUp(self):
+        from django.core.cache import caches
+
+        from sendsms.backends import dedup
+
+        caches["default"].clear()
+        dedup._stores.clear()
+        reset_outbox()
+
+    def tearDown(self):
+        reset_outbox()
+
+    def get_connection(self):
+        from sendsms.api import get_connection
+
+        with self.settings(DEDUP_SENDSMS_BACKEND="sendsms.backends.locmem.SmsBackend"):
+            return get_connection("sendsms.backends.dedup.SmsBackend")
+
+    def test_duplicates_are_dropped(self):
+        from sendsms.message import SmsMessage
+
+        connection = self.get_connection()
+        messages = [
+            SmsMessage(body="code 1234", from_phone="1", to=["2"]),
+            SmsMessage(body="code 1234", from_phone="1", to=["2"]),
+            SmsMessage(body="code 1234", from_phone="1", to=["3"]),
+            SmsMessage(body="hi", from_phone="1", to=["2"], idempotency_key="a"),
+            SmsMessage(body="hi again", from_phone="1", to=["2"], idempotency_key="a"),
+        ]
+        self.assertEqual(connection.send_messages(messages), 3)
+        self.assertEqual(len(sendsms.outbox), 3)
+        self.assertEqual(connection.suppressed, 2)
+
+        # another process sharing the cache
+        from sendsms.backends import dedup
+
+        dedup._stores.clear()
+        self.assertEqual(self.get_connection().send_messages(messages[:1]), 0)
+        self.assertEqual(dedup.get_store().suppressed, 1)
+
+    def test_failed_batch_can_be_retried(self):
+        from sendsms.message import SmsMessage
+
+        connection = self.get_connection()
+        message = SmsMessage(body="test", from_phone="1", to=["2"])
+        with mock.patch.object(
+            connection.connection, "send_messages", side_effect=IOError
+        ):
+            with self.assertRaises(IOError):
+                connection.send_messages([message])
+        self.assertEqual(connection.send_messages([message]), 1)
+
+    @mock.patch("requests.Session.request")
+    def test_unsent_messages_can_be_retried(self, request_mock):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+
+        request_mock.side_effect = [
+            mock.Mock(status_code=200, content=b"Result=OK"),
+            mock.Mock(status_code=500, content=b""),
+            mock.Mock(status_code=200, content=b"Result=OK"),
+        ]
+        with self.settings(DEDUP_SENDSMS_BACKEND="sendsms.backends.esendex.SmsBackend"):
+            connection = get_connection(
+                "sendsms.backends.dedup.SmsBackend", fail_silently=True
+            )
+        messages = [
+            SmsMessage(body="first", from_phone="1", to=["2"]),
+            SmsMessage(body="second", from_phone="1", to=["3"]),
+        ]
+        self.assertEqual(connection.send_messages(messages), 1)
+        self.assertEqual(connection.send_messages(messages), 1)
+        self.assertEqual(connection.suppressed, 1)
+        self.assertEqual(request_mock.call_count, 3)
+
+
+class PlanTest(SimpleTestCase):
+    def test_identical_messages_are_merged(self):
+        from sendsms.backends.base import BaseSmsBackend
+        from sendsms.message import SmsMessage
+
+        first = SmsMessage(body="test", from_phone="1", to=["2", "3"])
+        other = SmsMessage(body="other", from_phone="1", to=["4"])
+        second = SmsMessage(body="test", from_phone="1", to=["5"])
+        empty = SmsMessage(body="test", from_phone="1", to=[])
+
+        plan = BaseSmsBackend().plan([first, other, second, empty])
+        self.assertEqual(
+            [request.to for request, entries in plan], [["2", "3", "5"], ["4"]]
+        )
+        self.assertEqual(plan[0][1], [(first, ["2", "3"]), (second, ["5"])])
+        self.assertIs(plan[1][0], other)
+
+    def test_recipients_are_chunked(self):
+        from sendsms.api import get_connection
+        from sendsms.backends.base import BaseSmsBackend
+        from sendsms.message import SmsMessage
+
+        messages = [
+            SmsMessage(body="test", from_phone="1", to=["2", "3", "4"]),
+            SmsMessage(body="test", from_phone="1", to=["5"]),
+        ]
+        plan = BaseSmsBackend(max_recipients=3).plan(messages)
+        self.assertEqual(
+            [request.to for request, entries in plan], [["2", "3", "4"], ["5"]]
+        )
+        self.assertIs(plan[0][0], messages[0])
+
+        with self.settings(
+            SENDSMS_MAX_RECIPIENTS={"sendsms.backends.base.BaseSmsBackend": 2}
+        ):
+            plan = BaseSmsBackend().plan(messages)
+        self.assertEqual(
+            [request.to for request, entries in plan], [["2", "3"], ["4", "5"]]
+        )
+
+        # lifting the limit of a backend class
+        with self.settings(
+            SENDSMS_MAX_RECIPIENTS={"sendsms.backends.nexmo.SmsBackend": None}
+        ):
+            connection = get_connection("sendsms.backends.nexmo.SmsBackend")
+        self.assertIsNone(connection.max_recipients)
+        self.assertEqual(len(connection.plan(messages)), 1)
+
+    @mock.patch("requests.Session.request")
+    def test_campaign_requests(self, request_mock):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+
+        request_mock.side_effect = [
+            mock.Mock(status_code=200, content=b"Result=OK"),
+            mock.Mock(status_code=500, content=b""),
+        ]
+        connection = get_connection(
+            "sendsms.backends.esendex.SmsBackend", fail_silently=True, max_recipients=2
+        )
+        messages = [
+            SmsMessage(body="test", from_phone="1", to=["2"]),
+            SmsMessage(body="test", from_phone="1", to=["3", "4"]),
+        ]
+        self.assertEqual(connection.send_messages(messages), 1)
+        recipients = [
+            call[1]["data"]["EsendexRecipient"] for call in request_mock.call_args_list
+        ]
+        self.assertEqual(recipients, ["2,3", "4"])
+
+    def test_providers_declare_limits(self):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+
+        message = SmsMessage(
+            body="test", from_phone="1", to=[str(i) for i in range(250)]
+        )
+        for backend, limit in (
+            ("bulksms", 1000),
+            ("esendex", 100),
+            ("smsglobal", 100),
+            ("smspubli", 100),
+        ):
+            connection = get_connection("sendsms.backends.%s.SmsBackend" % backend)
+            self.assertEqual(connection.max_recipients, limit)
+        self.assertEqual(
+            [len(request.to) for request, entries in connection.plan([message])],
+            [100, 100, 50],
+        )
+
+
+class PhoneTest(SimpleTestCase):
+    def test_normalize(self):
+        from sendsms.exceptions import InvalidPhoneNumber
+        from sendsms.phone import INTERNATIONAL, format_number, normalize
+
+        self.assertEqual(normalize("+41 79 123 45 67"), "+41791234567")
+        self.assertEqual(normalize("0041 (79) 123-45-67"), "+41791234567")
+        self.assertEqual(normalize("079 123 45 67", "41"), "+41791234567")
+        self.assertEqual(format_number("+41791234567", INTERNATIONAL), "0041791234567")
+        for number in ("079 123 45 67", "+41 79", "+41 79 abc 45 67"):
+            with self.assertRaises(InvalidPhoneNumber):
+                normalize(number)
+
+    @override_settings(
+        SENDSMS_NORMALIZE_NUMBERS=True, SENDSMS_DEFAULT_COUNTRY_CODE="41"
+    )
+    def test_plan_normalizes_recipients(self):
+        from sendsms.backends.base import BaseSmsBackend
+        from sendsms.backends.ovhsms import OvhSmsBackend
+        from sendsms.exceptions import InvalidPhoneNumber
+        from sendsms.message import SmsMessage
+
+        message = SmsMessage(body="test", to=["079 123 45 67", "+41791234568"])
+        plan = BaseSmsBackend().plan([message])
+        self.assertEqual(plan[0][0].to, ["+41791234567", "+41791234568"])
+        self.assertEqual(message.to, ["079 123 45 67", "+41791234568"])
+        plan = OvhSmsBackend().plan([message])
+        self.assertEqual(plan[0][0].to, ["0041791234567"])
+
+        message.to.append("123")
+        with self.assertRaises(InvalidPhoneNumber):
+            BaseSmsBackend().plan([message])
+        plan = BaseSmsBackend(fail_silently=True).plan([message])
+        self.assertEqual(len(plan[0][0].to), 2)
+
+
+class OutboxTest(SimpleTestCase):
+    def tearDown(self):
+        reset_outbox()
+
+    @override_settings(SENDSMS_OUTBOX_MAXLEN=2)
+    def test_outbox_is_bounded_and_indexed(self):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+
+        outbox = reset_outbox()
+        connection = get_connection("sendsms.backends.locmem.SmsBackend")
+        messages = [
+            SmsMessage(body="first", from_phone="1", to=["2", "3"]),
+            SmsMessage(body="second", from_phone="1", to=["3"]),
+            SmsMessage(body="third", from_phone="4", to=["3"]),
+        ]
+        self.assertEqual(connection.send_messages(messages), 3)
+
+        self.assertIs(sendsms.outbox, outbox)
+        self.assertEqual([m.body for m in outbox], ["second", "third"])
+        self.assertEqual(outbox[-1].body, "third")
+        self.assertEqual(outbox.sent_to("2"), [])
+        self.assertEqual(outbox.sent_to("3"), messages[1:])
+        self.assertEqual(outbox.sent_from("1"), [messages[1]])
+        self.assertEqual(len(reset_outbox()), 0)
+
+    def test_concurrent_appends(self):
+        from sendsms.backends.locmem import Outbox
+        from sendsms.message import SmsMessage
+
+        outbox = Outbox(maxlen=50)
+
+        def send():
+            for i in range(100):
+                outbox.append(SmsMessage(body="test", from_phone="1", to=["2"]))
+
+        threads = [threading.Thread(target=send) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(outbox), 50)
+        self.assertEqual(len(outbox.sent_to("2")), 50)
+
+
+class EncodingTest(unittest.TestCase):
+    def test_encoding_detection(self):
+        from sendsms.message import SmsMessage
+
+        self.assertEqual(SmsMessage(body="Hello {world} €").encoding, "GSM-7")
+        self.assertEqual(SmsMessage(body="Wêlcome").encoding, "UCS-2")
+
+    def test_segment_count(self):
+        from sendsms.message import SmsMessage
+
+        self.assertEqual(SmsMessage(body="a" * 160).segment_count, 1)
+        self.assertEqual(SmsMessage(body="a" * 161).segment_count, 2)
+        self.assertEqual(SmsMessage(body="€" * 80).segment_count, 1)
+        self.assertEqual(SmsMessage(body="ê" * 70).segment_count, 1)
+        self.assertEqual(SmsMessage(body="ê" * 135).segment_count, 3)
+
+    def test_segments_do_not_split_wide_characters(self):
+        from sendsms.message import SmsMessage
+
+        message = SmsMessage(body="a" * 152 + "€" + "b" * 10)
+        self.assertEqual(message.segments(), ["a" * 152, "€" + "b" * 10])
+        self.assertEqual(message.segment_count, 2)
+
+        message = SmsMessage(body="\U0001f600" * 36)
+        self.assertEqual(message.segments(), ["\U0001f600" * 33, "\U0001f600" * 3])
+
+
+def run_async(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class AsyncApiTest(SimpleTestCase):
+    def setUp(self):
+        reset_outbox()
+
+    def tearDown(self):
+        reset_outbox()
+
+    def test_async_send_sms_offloads_sync_backend(self):
+        from sendsms.api import async_send_sms
+
+        res = run_async(
+            async_send_sms(body="test", from_phone="111111111", to=["222222222"])
+        )
+        self.assertEqual(res, 1)
+        self.assertEqual(len(sendsms.outbox), 1)
+
+    def test_async_send_mass_sms_native_backend(self):
+        from sendsms.api import async_send_mass_sms, get_connection
+
+        requests = []
+
+        async def request(client, method, url, **kwargs):
+            requests.append((method, url, kwargs["data"]["EsendexRecipient"]))
+            return mock.Mock(status_code=200, content=b"Result=OK")
+
+        connection = get_connection("sendsms.backends.esendex.SmsBackend")
+        datatuple = [
+            ("first", "111111111", ["222222222"], False),
+            ("second", "111111111", ["333333333"], False),
+        ]
+        with mock.patch("httpx.AsyncClient.request", new=request):
+            res = run_async(async_send_mass_sms(datatuple, connection=connection))
+
+        self.assertEqual(res, 2)
+        self.assertEqual([r[2] for r in requests], ["222222222", "333333333"])
+        self.assertIsNone(connection.async_client)
+
+
 class RQBackendTest(SimpleTestCase):
-    @mock.patch("sendsms.backends.rq.send_messages")
-    def test_should_queue_sms(self, send_messages_mock):
+    @mock.patch("django_rq.get_queue")
+    def test_should_queue_sms(self, get_queue_mock):
+        from sendsms.backends import rq
         from sendsms.message import SmsMessage
 
         with self.settings(SENDSMS_BACKEND="sendsms.backends.rq.SmsBackend"):
@@ -62,7 +1337,50 @@ class RQBackendTest(SimpleTestCase):
             )
             message.send()
 
-        send_messages_mock.delay.assert_called_with([message])
+        get_queue_mock.assert_called_with("default")
+        get_queue_mock.return_value.enqueue.assert_called_with(
+            rq.send_messages, [message.to_dict()], job_timeout=None
+        )
+
+    @mock.patch("django_rq.get_queue")
+    def test_should_queue_chunks(self, get_queue_mock):
+        from sendsms.api import get_connection
+        from sendsms.backends import rq
+        from sendsms.message import SmsMessage
+
+        messages = [
+            SmsMessage(body="Hello!", from_phone="29290", to=["+%d" % i])
+            for i in range(5)
+        ]
+        with self.settings(
+            RQ_SENDSMS_QUEUE="sms", RQ_SENDSMS_CHUNK_SIZE=2, RQ_SENDSMS_JOB_TIMEOUT=60
+        ):
+            connection = get_connection("sendsms.backends.rq.SmsBackend")
+        self.assertEqual(connection.send_messages(messages), 5)
+
+        get_queue_mock.assert_called_once_with("sms")
+        calls = get_queue_mock.return_value.enqueue.call_args_list
+        self.assertEqual([len(call[0][1]) for call in calls], [2, 2, 1])
+        self.assertEqual(
+            calls[0], mock.call(rq.send_messages, mock.ANY, job_timeout=60)
+        )
+
+    @mock.patch("sendsms.api.get_connection")
+    def test_worker_reuses_connection(self, get_connection_mock):
+        from sendsms.api import close_worker_connections
+        from sendsms.backends import rq
+
+        close_worker_connections()
+        backend = get_connection_mock.return_value
+        backend.send_messages.return_value = 1
+        payload = [{"body": "Hello!", "from_phone": "29290", "to": ["+1"]}]
+        self.assertEqual(rq.send_messages(payload), 1)
+        self.assertEqual(rq.send_messages(payload), 1)
+
+        get_connection_mock.assert_called_once_with(
+            "sendsms.backends.locmem.SmsBackend"
+        )
+        backend.open.assert_called_once_with()
 
     @mock.patch("sendsms.backends.twiliorest.SmsBackend")
     @mock.patch("sendsms.backends.locmem.SmsBackend")
@@ -87,8 +1405,6 @@ class RQBackendTest(SimpleTestCase):
             with self.settings(
                 RQ_SENDSMS_BACKEND="sendsms.backends.locmem.SmsBackend"
             ):  # noqa
-                reload(rq)
-
                 backend = LocmemBackend()
                 message = SmsMessage(
                     body="Hello!", from_phone="29290", to=["+639123456789"]
@@ -108,7 +1424,48 @@ class CeleryBackendTest(SimpleTestCase):
             )
             message.send()
 
-        send_messages_mock.delay.assert_called_with([message])
+        send_messages_mock.delay.assert_called_with([message.to_dict()])
+
+    @mock.patch("sendsms.backends.celery.group")
+    @mock.patch("sendsms.backends.celery.send_messages")
+    def test_should_queue_chunks_as_group(self, send_messages_mock, group_mock):
+        from sendsms.api import get_connection
+        from sendsms.message import SmsMessage
+
+        messages = [
+            SmsMessage(body="Hello!", from_phone="29290", to=["+%d" % i])
+            for i in range(5)
+        ]
+        with self.settings(CELERY_SENDSMS_CHUNK_SIZE=2):
+            connection = get_connection("sendsms.backends.celery.SmsBackend")
+        self.assertEqual(connection.send_messages(messages), 5)
+
+        chunks = [call[0][0] for call in send_messages_mock.s.call_args_list]
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(
+            chunks[2], [{"body": "Hello!", "from_phone": "29290", "to": ["+4"]}]
+        )
+        group_mock.return_value.apply_async.assert_called_once_with()
+        send_messages_mock.delay.assert_not_called()
+
+    @mock.patch("sendsms.api.get_connection")
+    def test_worker_reuses_connection(self, get_connection_mock):
+        from sendsms.api import close_worker_connections
+        from sendsms.backends import celery
+
+        close_worker_connections()
+        backend = get_connection_mock.return_value
+        backend.send_messages.return_value = 1
+        payload = [{"body": "Hello!", "from_phone": "29290", "to": ["+1"]}]
+        self.assertEqual(celery.send_messages(payload), 1)
+        self.assertEqual(celery.send_messages(payload), 1)
+
+        get_connection_mock.assert_called_once_with(
+            "sendsms.backends.locmem.SmsBackend"
+        )
+        backend.open.assert_called_once_with()
+        message = backend.send_messages.call_args[0][0][0]
+        self.assertEqual(message.to, ["+1"])
 
     @mock.patch("sendsms.backends.twiliorest.SmsBackend")
     @mock.patch("sendsms.backends.locmem.SmsBackend")
@@ -133,8 +1490,6 @@ class CeleryBackendTest(SimpleTestCase):
             with self.settings(
                 CELERY_SENDSMS_BACKEND="sendsms.backends.locmem.SmsBackend"
             ):  # noqa
-                reload(celery)
-
                 backend = LocmemBackend()
                 message = SmsMessage(
                     body="Hello!", from_phone="29290", to=["+639123456789"]
@@ -170,7 +1525,7 @@ class OvhBackendTest(SimpleTestCase):
 
         expected = (
             "http://fakeurl/?account=myaccount&class=1&contentType=text%2Fjson&from=29290&login=mylogin&"
-            "message=Hello%21&noStop=0&password=mypwd&smsCoding=2&to=%2B639123456789",
+            "message=Hello%21&noStop=0&password=mypwd&smsCoding=1&to=%2B639123456789",
         )
 
         self.assertEqual(_call_url_mock.call_args, (expected,))